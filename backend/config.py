@@ -23,10 +23,13 @@ class Settings(BaseSettings):
     openai_api_key: Optional[str] = None
     groq_api_key: Optional[str] = None
     summary_model: Optional[str] = "llama-3.1-8b-instant"
+    summary_cache_size: int = 1000  # Max cached summaries keyed by content hash (0 disables)
     
     # Qdrant Vector Database
     qdrant_host: str = "localhost"
     qdrant_port: int = 6333
+    qdrant_grpc_port: int = 6334
+    qdrant_prefer_grpc: bool = True  # Use gRPC (protobuf) instead of REST/JSON for data calls
     qdrant_collection_name: str = "memories"
     qdrant_api_key: Optional[str] = Field(default=None, alias="QDRANT_API_KEY")
     qdrant_url: Optional[str] = Field(default=None, alias="QDRANT_URL")  # Use for Qdrant Cloud (https://...)
@@ -35,14 +38,22 @@ class Settings(BaseSettings):
     qdrant_use_https: bool = Field(default=False, alias="QDRANT_USE_HTTPS")
     qdrant_timeout: int = 10
     qdrant_relationship_collection_name: str = "memory_relationships"
+    qdrant_int8_quantization: bool = True  # Keep int8-quantized vectors in RAM (False = float32 only)
+    qdrant_upsert_batch_size: int = 64  # Points per upsert request for bulk writes
+    qdrant_hnsw_ef: int = 64  # HNSW search beam width (higher = better recall, slower)
+    qdrant_pool_size: int = 100  # Max pooled keep-alive HTTP connections to Qdrant (REST)
     
     # Embedding Configuration
     embedding_model: str = "all-MiniLM-L6-v2"
     embedding_dimension: int = 384  # for all-MiniLM-L6-v2
+    embedding_cache_size: int = 10000  # Max cached embeddings keyed by content hash (0 disables)
+    embedding_coalesce_window_ms: int = 25  # Window for batching concurrent single-chunk embeds
     
     # Chunking Configuration
     chunk_size: int = 500
     chunk_overlap: int = 50
+    ingest_batch_size: int = 64  # Chunks embedded and indexed per micro-batch
+    ingest_batch_fetch_concurrency: int = 4  # Link fetches/summaries in flight per batch ingest
     
     # Relationship Detection
     similarity_threshold_update: float = 0.65  # High similarity = likely an update
@@ -52,6 +63,10 @@ class Settings(BaseSettings):
     hot_memory_age_days: int = 30  # Memories younger than this are "hot"
     hot_memory_access_threshold: int = 5  # Memories accessed more than this are "hot"
     cold_storage_enabled: bool = True  # Enable hot/cold tiering
+    tier_promotion_flush_ms: int = 50  # Delay before queued cold->hot promotions are applied
+    cold_tier_max_size: int = 0  # Max memories tracked in the cold tier (0 = unbounded)
+    cold_tier_eviction_log: Optional[str] = None  # File evicted memory IDs are appended to before they are dropped
+    tier_rebalance_interval_minutes: int = 60  # How often tiers are rebalanced and the cold tier trimmed (0 disables)
     
     # Time Decay Configuration
     time_decay_half_life_days: int = 90  # Days for score to decay to 50%
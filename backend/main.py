@@ -1,6 +1,7 @@
 """Main FastAPI application for Second Brain"""
 
 from pathlib import Path
+import asyncio
 import sys
 
 CURRENT_DIR = Path(__file__).resolve().parent
@@ -10,6 +11,7 @@ if str(REPO_ROOT) not in sys.path:
 
 from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from datetime import datetime as dt
 from typing import List, Optional, Dict, Any, Tuple
 from pydantic import BaseModel
@@ -24,6 +26,7 @@ from backend.services import (
     get_memory_tiering,
 )
 from backend.services.auth_service import AuthenticatedUser, get_current_user
+from backend.utils import iter_html
 
 import logging
 
@@ -34,6 +37,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Maximum number of entries accepted by /documents/ingest_batch
+MAX_INGEST_BATCH_SIZE = 100
+
 # Groq client (optional)
 try:
     from groq import Groq
@@ -59,6 +65,25 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+async def start_tier_rebalancing():
+    """Periodically rebalance memory tiers (demotion and cold-tier eviction)"""
+    if settings.tier_rebalance_interval_minutes <= 0:
+        return
+    memory_tiering = get_memory_tiering()
+    app.state.tier_rebalance_task = asyncio.create_task(
+        memory_tiering.rebalance_periodically(settings.tier_rebalance_interval_minutes * 60)
+    )
+
+
+@app.on_event("shutdown")
+async def stop_tier_rebalancing():
+    """Stop the periodic tier rebalance"""
+    task = getattr(app.state, "tier_rebalance_task", None)
+    if task is not None:
+        task.cancel()
+
+
 # Health check
 @app.get("/")
 async def root():
@@ -96,44 +121,115 @@ async def ingest_document(
     """
     try:
         payload, upload_file = await _parse_ingest_request(request)
+        background = _is_truthy(
+            payload.get("background") or request.query_params.get("background")
+        )
+
+        ingestion_service = get_ingestion_service()
+        return await ingestion_service.ingest_entry(
+            user_id=current_user.id,
+            upload_file=upload_file,
+            background=background,
+            **_entry_fields(payload),
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error ingesting document: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        def _clean(value: Optional[str]) -> Optional[str]:
-            if isinstance(value, str):
-                value = value.strip()
-                return value or None
-            return value
 
-        doc_type = (payload.get("type") or payload.get("doc_type") or "note").lower()
-        title = _clean(payload.get("title") or payload.get("name"))
-        description = _clean(payload.get("description") or payload.get("summary"))
-        note_content = payload.get("content") or payload.get("text")
-        link_url = _clean(payload.get("url") or payload.get("link"))
-        source_override = _clean(payload.get("source"))
+class BatchIngestResult(BaseModel):
+    """Outcome of one entry of a batch ingest"""
+    index: int
+    document: Optional[Document] = None  # Missing if the entry was rejected before processing
+    error: Optional[str] = None
 
-        if title and len(title) > 500:
-            raise HTTPException(status_code=400, detail="Title too long. Maximum 500 characters")
+
+@app.post("/documents/ingest_batch", response_model=List[BatchIngestResult])
+async def ingest_documents_batch(
+    request: Request,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
+    """
+    Ingest several notes/links in one request.
+    
+    Accepts a JSON list of entries with the same fields as `/documents/ingest`
+    (file uploads are not supported). Single-chunk entries are embedded in one
+    batch; entries are then indexed and linked in list order.
+    
+    Returns one result per entry, in order: the document, and an error message
+    if that entry failed. A failed entry does not fail the rest of the batch.
+    """
+    try:
+        try:
+            entries = await request.json()
+        except Exception:
+            entries = None
+        if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+            raise HTTPException(status_code=400, detail="Expected a JSON list of entries")
+        if len(entries) > MAX_INGEST_BATCH_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many entries. Maximum {MAX_INGEST_BATCH_SIZE} per batch",
+            )
+
+        # Entries with invalid fields are reported without being ingested
+        results: List[BatchIngestResult] = []
+        valid: List[Tuple[int, Dict[str, Any]]] = []
+        for index, entry in enumerate(entries):
+            try:
+                valid.append((index, _entry_fields(entry)))
+            except ValueError as exc:
+                results.append(BatchIngestResult(index=index, error=str(exc)))
 
         ingestion_service = get_ingestion_service()
-        document = await ingestion_service.ingest_entry(
+        outcomes = await ingestion_service.ingest_entries(
             user_id=current_user.id,
-            entry_type=doc_type,
-            title=title,
-            description=description,
-            note_content=note_content,
-            link_url=link_url,
-            upload_file=upload_file,
-            explicit_source=source_override,
+            entries=[fields for _, fields in valid],
+            background=_is_truthy(request.query_params.get("background")),
         )
-        return document
+        for (index, _), outcome in zip(valid, outcomes):
+            if isinstance(outcome, Document):
+                results.append(BatchIngestResult(index=index, document=outcome, error=outcome.error_message))
+            else:
+                if not isinstance(outcome, ValueError):
+                    logger.error(f"Error ingesting batch entry {index}: {outcome}")
+                results.append(BatchIngestResult(index=index, error=str(outcome)))
+
+        results.sort(key=lambda result: result.index)
+        return results
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error ingesting document: {e}")
+        logger.error(f"Error ingesting document batch: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/documents/{document_id}", response_model=Document)
+async def get_document(
+    document_id: str,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
+    """
+    Get a recently queued document, including its processing status.
+    
+    Use this to poll documents ingested with `background=true`; the content is
+    cleared once processing finishes.
+    """
+    ingestion_service = get_ingestion_service()
+    document = ingestion_service.get_document(document_id, user_id=current_user.id)
+    
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    return document
+
+
 @app.get("/documents/{document_id}/memories", response_model=List[Memory])
 async def get_document_memories(
     document_id: str,
@@ -244,6 +340,20 @@ async def export_graph(current_user: AuthenticatedUser = Depends(get_current_use
     return graph_store.export_graph(user_id=current_user.id)
 
 
+@app.get("/graph/visualize")
+async def visualize_graph(current_user: AuthenticatedUser = Depends(get_current_user)):
+    """
+    Render the knowledge graph as an interactive HTML page.
+    
+    The page is streamed, so the header and stats arrive before the graph JSON.
+    """
+    graph_store = get_graph_store()
+    return StreamingResponse(
+        iter_html(graph_store.export_graph(user_id=current_user.id)),
+        media_type="text/html",
+    )
+
+
 @app.get("/graph/stats")
 async def get_graph_stats(current_user: AuthenticatedUser = Depends(get_current_user)):
     """Get statistics about the knowledge graph"""
@@ -251,6 +361,36 @@ async def get_graph_stats(current_user: AuthenticatedUser = Depends(get_current_
     return graph_store.get_graph_stats(user_id=current_user.id)
 
 
+def _is_truthy(value: Any) -> bool:
+    """Interpret JSON booleans and form/query strings such as "true" or "1"."""
+    if isinstance(value, str):
+        return value.strip().lower() in {"1", "true", "yes", "on"}
+    return bool(value)
+
+
+def _entry_fields(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize an ingest payload into IngestionService.prepare_entry arguments."""
+
+    def _clean(value: Optional[str]) -> Optional[str]:
+        if isinstance(value, str):
+            value = value.strip()
+            return value or None
+        return value
+
+    title = _clean(payload.get("title") or payload.get("name"))
+    if title and len(title) > 500:
+        raise ValueError("Title too long. Maximum 500 characters")
+
+    return {
+        "entry_type": (payload.get("type") or payload.get("doc_type") or "note").lower(),
+        "title": title,
+        "description": _clean(payload.get("description") or payload.get("summary")),
+        "note_content": payload.get("content") or payload.get("text"),
+        "link_url": _clean(payload.get("url") or payload.get("link")),
+        "explicit_source": _clean(payload.get("source")),
+    }
+
+
 async def _parse_ingest_request(request: Request) -> Tuple[Dict[str, Any], Optional[UploadFile]]:
     """Support both JSON and multipart ingestion payloads."""
     content_type = (request.headers.get("content-type") or "").lower()
@@ -82,6 +82,7 @@ class Memory(BaseModel):
     # Metadata
     keywords: List[str] = Field(default_factory=list)
     entities: List[str] = Field(default_factory=list)  # Named entities extracted
+    entities_by_type: Dict[str, List[str]] = Field(default_factory=dict)  # Entities grouped by type
     metadata: Dict[str, Any] = Field(default_factory=dict)
     
     # Timestamps
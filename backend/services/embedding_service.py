@@ -1,8 +1,14 @@
 """Embedding service for converting text to vectors"""
 
 import os
+import asyncio
+import hashlib
 import logging
-from typing import List
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
 
 os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
 
@@ -22,6 +28,34 @@ class EmbeddingService:
         self.model = SentenceTransformer(self.model_name)
         self.dimension = self.model.get_sentence_embedding_dimension()
         logger.info(f"Model loaded. Embedding dimension: {self.dimension}")
+        # LRU cache of embeddings keyed by content hash, so re-imported or
+        # overlapping content skips the model. Vectors are kept as float32
+        # arrays (~1.5 KB for 384 dims vs ~12 KB as a list of Python floats).
+        self._cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._cache_size = settings.embedding_cache_size
+        self._cache_lock = threading.Lock()
+    
+    def _cache_key(self, text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+    
+    def _cache_get(self, key: bytes) -> Optional[List[float]]:
+        with self._cache_lock:
+            embedding = self._cache.get(key)
+            if embedding is None:
+                return None
+            self._cache.move_to_end(key)
+        return embedding.tolist()
+    
+    def _cache_put(self, key: bytes, embedding: np.ndarray):
+        if self._cache_size <= 0:
+            return
+        # Copy so a cached row doesn't keep the whole batch array alive
+        embedding = np.array(embedding, dtype=np.float32)
+        with self._cache_lock:
+            self._cache[key] = embedding
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
     
     def embed_text(self, text: str) -> List[float]:
         """
@@ -33,7 +67,13 @@ class EmbeddingService:
         Returns:
             List of floats representing the embedding vector
         """
+        key = self._cache_key(text)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
         embedding = self.model.encode(text, convert_to_numpy=True)
+        self._cache_put(key, embedding)
         return embedding.tolist()
     
     def embed_batch(self, texts: List[str]) -> List[List[float]]:
@@ -46,8 +86,40 @@ class EmbeddingService:
         Returns:
             List of embedding vectors
         """
-        embeddings = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=True)
-        return [emb.tolist() for emb in embeddings]
+        keys = [self._cache_key(text) for text in texts]
+        results: List[Optional[List[float]]] = [self._cache_get(key) for key in keys]
+        
+        # Only send cache misses to the model (deduplicated within the batch)
+        miss_positions = {}
+        for idx, (key, cached) in enumerate(zip(keys, results)):
+            if cached is None:
+                miss_positions.setdefault(key, []).append(idx)
+        
+        if miss_positions:
+            miss_texts = [texts[positions[0]] for positions in miss_positions.values()]
+            # encode() already length-sorts its input into mini-batches to limit
+            # padding and restores the original order, so no pre-sorting here
+            embeddings = self.model.encode(miss_texts, convert_to_numpy=True, show_progress_bar=True)
+            for (key, positions), emb in zip(miss_positions.items(), embeddings):
+                self._cache_put(key, emb)
+                embedding = emb.tolist()
+                for idx in positions:
+                    results[idx] = embedding
+        
+        logger.debug(f"Embedding cache misses: {len(miss_positions)}/{len(texts)}")
+        return results
+    
+    async def aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for multiple texts without blocking the event loop.
+        
+        Args:
+            texts: List of input texts
+            
+        Returns:
+            List of embedding vectors
+        """
+        return await asyncio.to_thread(self.embed_batch, texts)
     
     def compute_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
         """
@@ -60,8 +132,6 @@ class EmbeddingService:
         Returns:
             Similarity score between 0 and 1
         """
-        import numpy as np
-        
         vec1 = np.array(embedding1)
         vec2 = np.array(embedding2)
         
@@ -79,6 +149,69 @@ class EmbeddingService:
         return float((similarity + 1) / 2)
 
 
+class EmbeddingBatcher:
+    """
+    Coalesces single-text embedding requests from concurrent callers.
+    
+    Requests arriving within a short window are embedded together in one
+    batch, so many concurrent single-chunk ingests share a model call.
+    """
+    
+    def __init__(self, embedding_service: EmbeddingService, window_seconds: float, max_batch: int):
+        self.embedding_service = embedding_service
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks: Set[asyncio.Task] = set()
+    
+    async def embed(self, text: str) -> List[float]:
+        """
+        Embed a single text as part of the next coalesced batch.
+        
+        Args:
+            text: Input text
+            
+        Returns:
+            Embedding vector
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window_seconds, self._flush)
+        
+        return await future
+    
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._embed_pending(batch))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+    
+    async def _embed_pending(self, batch: List[Tuple[str, asyncio.Future]]):
+        try:
+            embeddings = await self.embedding_service.aembed_batch([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        logger.debug(f"Embedded coalesced batch of {len(batch)} texts")
+        for (_, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+
 # Global instance
 _embedding_service = None
 
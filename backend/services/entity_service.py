@@ -14,6 +14,20 @@ class EntityService:
     Can be extended with spaCy or transformers for advanced NER.
     """
     
+    # Weights per entity type used by calculate_entity_similarity
+    ENTITY_WEIGHTS = {
+        'persons': 0.25,
+        'organizations': 0.25,
+        'locations': 0.15,
+        'products': 0.25,  # High weight for products
+        'emails': 0.05,
+        'urls': 0.05,
+        'phones': 0.05,
+        'dates': 0.0,
+        'numbers': 0.0,
+        'keywords': 0.1
+    }
+    
     def __init__(self):
         """Initialize entity service with common patterns"""
         # Patterns for entity detection
@@ -24,6 +38,11 @@ class EntityService:
             'date': r'\b(?:\d{1,2}[-/]\d{1,2}[-/]\d{2,4}|\d{4}[-/]\d{1,2}[-/]\d{1,2})\b',
             'number': r'\b\d+(?:\.\d+)?\b',
         }
+        self._compiled_patterns = {
+            entity_type: re.compile(pattern, re.IGNORECASE)
+            for entity_type, pattern in self.patterns.items()
+        }
+        self._capitalized_pattern = re.compile(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b')
         
         # Common entity keywords (simple heuristic)
         self.person_indicators = {
@@ -71,8 +90,8 @@ class EntityService:
         }
         
         # Extract pattern-based entities
-        for entity_type, pattern in self.patterns.items():
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for entity_type, pattern in self._compiled_patterns.items():
+            matches = pattern.findall(text)
             if entity_type == 'email':
                 entities['emails'].update(matches)
             elif entity_type == 'url':
@@ -85,7 +104,7 @@ class EntityService:
                 entities['numbers'].update(matches)
         
         # Extract capitalized words (potential proper nouns)
-        capitalized = re.findall(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b', text)
+        capitalized = self._capitalized_pattern.findall(text)
         
         # Classify capitalized words
         for word in capitalized:
@@ -115,6 +134,18 @@ class EntityService:
         
         return entities
     
+    def extract_entities_batch(self, texts: List[str]) -> List[Dict[str, Set[str]]]:
+        """
+        Extract entities from multiple texts.
+        
+        Args:
+            texts: Input texts
+            
+        Returns:
+            One entity dictionary per input text, in input order
+        """
+        return [self.extract_entities(text) for text in texts]
+    
     def get_entity_overlap(
         self,
         entities1: Dict[str, Set[str]],
@@ -166,18 +197,7 @@ class EntityService:
         Returns:
             Similarity score (0.0 to 1.0)
         """
-        weights = {
-            'persons': 0.25,
-            'organizations': 0.25,
-            'locations': 0.15,
-            'products': 0.25,  # High weight for products
-            'emails': 0.05,
-            'urls': 0.05,
-            'phones': 0.05,
-            'dates': 0.0,
-            'numbers': 0.0,
-            'keywords': 0.1
-        }
+        weights = self.ENTITY_WEIGHTS
         
         overlap = self.get_entity_overlap(entities1, entities2)
         
@@ -1,10 +1,13 @@
 """Graph store for managing memory relationships"""
 
-from typing import List, Dict, Any, Optional, Set
+from typing import List, Dict, Any, Optional, Set, Union
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import networkx as nx
 from backend.models import Memory, MemoryRelationship, RelationshipType
-from backend.services.vector_store import get_vector_store
+from backend.services.vector_store import get_vector_store, parse_payload_datetime
+from backend.services.entity_service import get_entity_service
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,11 +27,9 @@ class GraphStore:
         if not self._hydrated:
             self._hydrate_from_storage()
 
-    def _parse_datetime(self, value: Optional[str]) -> datetime:
-        if not value:
-            return datetime.utcnow()
+    def _parse_datetime(self, value: Optional[Union[str, int]]) -> datetime:
         try:
-            return datetime.fromisoformat(value)
+            return parse_payload_datetime(value) or datetime.utcnow()
         except Exception:
             return datetime.utcnow()
 
@@ -41,11 +42,22 @@ class GraphStore:
             logger.warning(f"Vector store unavailable during graph hydration: {exc}")
             return
 
+        entity_service = get_entity_service()
+        # Scroll both collections concurrently; relationships load in a worker
+        # thread while memories are fetched and parsed here
+        executor = ThreadPoolExecutor(max_workers=1)
         try:
+            relationships_future = executor.submit(vector_store.fetch_all_relationships)
             records = vector_store.fetch_all_memories()
             for record in records:
                 payload = record.payload or {}
                 try:
+                    metadata = payload.get("metadata", {})
+                    # Legacy rows kept entities_by_type inside metadata
+                    entities_by_type = payload.get("entities_by_type") or metadata.pop("entities_by_type", None)
+                    if entities_by_type is None:
+                        extracted = entity_service.extract_entities(payload.get("content", ""))
+                        entities_by_type = {k: list(v) for k, v in extracted.items()}
                     memory = Memory(
                         id=str(record.id),
                         user_id=payload.get("user_id"),
@@ -57,7 +69,8 @@ class GraphStore:
                         embedding_model=payload.get("embedding_model"),
                         keywords=payload.get("keywords", []),
                         entities=payload.get("entities", []),
-                        metadata=payload.get("metadata", {}),
+                        entities_by_type=entities_by_type,
+                        metadata=metadata,
                         is_latest=payload.get("is_latest", True),
                         is_active=payload.get("is_active", True),
                         created_at=self._parse_datetime(payload.get("created_at")),
@@ -67,7 +80,7 @@ class GraphStore:
                 except Exception as exc:
                     logger.warning(f"Failed to hydrate memory {record.id}: {exc}")
 
-            relationship_records = vector_store.fetch_all_relationships()
+            relationship_records = relationships_future.result()
             for record in relationship_records:
                 payload = record.payload or {}
                 try:
@@ -91,6 +104,8 @@ class GraphStore:
             logger.info("Hydrated graph store from vector store persistence")
         except Exception as exc:
             logger.error(f"Error hydrating graph store: {exc}")
+        finally:
+            executor.shutdown(wait=False)
     
     def add_memory(self, memory: Memory):
         """
@@ -112,12 +127,43 @@ class GraphStore:
         )
         logger.debug(f"Added memory node to graph: {memory.id}")
     
-    def add_relationship(self, relationship: MemoryRelationship, persist: bool = True):
+    def add_memories_batch(self, memories: List[Memory]):
+        """
+        Add multiple memory nodes to the graph in one update.
+        
+        Args:
+            memories: Memory objects
+        """
+        new_memories = [memory for memory in memories if memory.id not in self.memories]
+        if not new_memories:
+            return
+        for memory in new_memories:
+            self.memories[memory.id] = memory
+        self.graph.add_nodes_from(
+            (
+                memory.id,
+                {
+                    "content": memory.content[:100],  # Store truncated content
+                    "is_latest": memory.is_latest,
+                    "is_active": memory.is_active,
+                    "created_at": memory.created_at.isoformat(),
+                    "user_id": memory.user_id,
+                },
+            )
+            for memory in new_memories
+        )
+        logger.debug(f"Added {len(new_memories)} memory nodes to graph")
+    
+    def add_relationship(self, relationship: MemoryRelationship, persist: bool = True) -> bool:
         """
         Add a relationship edge between memories.
         
         Args:
             relationship: MemoryRelationship object
+            persist: Also write the relationship to the vector store
+            
+        Returns:
+            True if the relationship was added
         """
         from_memory = self.memories.get(relationship.from_memory_id)
         to_memory = self.memories.get(relationship.to_memory_id)
@@ -128,14 +174,14 @@ class GraphStore:
                     "Skipping relationship between memories that belong to different users: "
                     f"{relationship.from_memory_id} -> {relationship.to_memory_id}"
                 )
-                return
+                return False
             relationship.user_id = relationship.user_id or from_memory.user_id
         else:
             logger.warning(
                 "Skipping relationship because one of the memories is missing: "
                 f"{relationship.from_memory_id} -> {relationship.to_memory_id}"
             )
-            return
+            return False
 
         self.relationships[relationship.id] = relationship
         
@@ -170,6 +216,45 @@ class GraphStore:
             f"-[{relationship.relationship_type.value}]-> "
             f"{relationship.to_memory_id}"
         )
+        return True
+    
+    def add_relationships_batch(
+        self,
+        relationships: List[MemoryRelationship],
+        persist: bool = True,
+    ) -> List[MemoryRelationship]:
+        """
+        Add multiple relationship edges, persisting them in one bulk write.
+        
+        Args:
+            relationships: MemoryRelationship objects
+            persist: Also write the relationships to the vector store
+            
+        Returns:
+            The relationships that were added
+        """
+        added = [
+            relationship for relationship in relationships
+            if self.add_relationship(relationship, persist=False)
+        ]
+        if persist:
+            self.persist_relationships(added)
+        return added
+    
+    def persist_relationships(self, relationships: List[MemoryRelationship]):
+        """
+        Write relationships already in the graph to the vector store.
+        
+        Args:
+            relationships: MemoryRelationship objects
+        """
+        if not relationships:
+            return
+        try:
+            vector_store = get_vector_store()
+            vector_store.add_relationships_batch(relationships)
+        except Exception as exc:
+            logger.error(f"Failed to persist {len(relationships)} relationships: {exc}")
     
     def get_memory(self, memory_id: str, user_id: Optional[str] = None) -> Optional[Memory]:
         """Get a memory by ID (optionally scoped to a user)"""
@@ -181,6 +266,16 @@ class GraphStore:
             return None
         return memory
     
+    def get_memories_batch(self, memory_ids: List[str], user_id: Optional[str] = None) -> Dict[str, Memory]:
+        """Get memories by ID (optionally scoped to a user); missing IDs are omitted"""
+        self._ensure_hydrated()
+        found = {}
+        for memory_id in memory_ids:
+            memory = self.memories.get(memory_id)
+            if memory and (not user_id or memory.user_id == user_id):
+                found[memory_id] = memory
+        return found
+    
     def get_all_memories(self, user_id: Optional[str] = None) -> List[Memory]:
         """Get all memories (optionally scoped to a user)"""
         self._ensure_hydrated()
@@ -303,6 +398,36 @@ class GraphStore:
         
         return [self.memories[mid] for mid in related_ids if mid in self.memories]
     
+    def get_related_memories_batch(
+        self,
+        memory_ids: List[str],
+        relationship_type: Optional[RelationshipType] = None,
+        max_depth: int = 1,
+        user_id: Optional[str] = None,
+    ) -> Dict[str, List[Memory]]:
+        """
+        Get related memories for several memories at once.
+        
+        Args:
+            memory_ids: Starting memory IDs
+            relationship_type: Filter by relationship type
+            max_depth: Maximum traversal depth
+            
+        Returns:
+            Related memories keyed by starting memory ID
+        """
+        self._ensure_hydrated()
+        # Each distinct ID is traversed once, however often it is requested
+        return {
+            memory_id: self.get_related_memories(
+                memory_id,
+                relationship_type=relationship_type,
+                max_depth=max_depth,
+                user_id=user_id,
+            )
+            for memory_id in dict.fromkeys(memory_ids)
+        }
+    
     def mark_memory_outdated(self, memory_id: str):
         """
         Mark a memory as outdated (not latest).
@@ -310,48 +435,75 @@ class GraphStore:
         Args:
             memory_id: Memory ID to mark as outdated
         """
-        if memory_id in self.memories:
+        self.mark_memories_outdated([memory_id])
+    
+    def mark_memories_outdated(self, memory_ids: List[str], persist: bool = True) -> List[str]:
+        """
+        Mark several memories as outdated (not latest).
+        
+        Args:
+            memory_ids: Memory IDs to mark as outdated
+            persist: Also write the flag to the vector store
+            
+        Returns:
+            IDs of the memories that were marked
+        """
+        marked = [memory_id for memory_id in dict.fromkeys(memory_ids) if memory_id in self.memories]
+        if not marked:
+            return marked
+        
+        for memory_id in marked:
             self.memories[memory_id].is_latest = False
             if memory_id in self.graph:
                 self.graph.nodes[memory_id]['is_latest'] = False
-            logger.debug(f"Marked memory as outdated: {memory_id}")
+        
+        if persist:
+            self.persist_outdated(marked)
+        logger.debug(f"Marked {len(marked)} memories as outdated")
+        return marked
+    
+    def persist_outdated(self, memory_ids: List[str]):
+        """
+        Write the outdated flag of memories to the vector store.
+        
+        Args:
+            memory_ids: Memory IDs already marked as outdated in the graph
+        """
+        if not memory_ids:
+            return
+        # Keep the vector store payloads in sync so searches can filter on them
+        try:
+            vector_store = get_vector_store()
+            vector_store.update_memories_payload_bulk(
+                {memory_id: {"is_latest": False} for memory_id in memory_ids}
+            )
+        except Exception as exc:
+            logger.error(f"Failed to persist outdated flag for {len(memory_ids)} memories: {exc}")
     
     def get_graph_stats(self, user_id: Optional[str] = None) -> Dict[str, Any]:
         """Get statistics about the knowledge graph (optionally scoped to a user)"""
         self._ensure_hydrated()
-        memories = self.get_all_memories(user_id)
-        total_relationships = (
-            len([rel for rel in self.relationships.values() if not user_id or rel.user_id == user_id])
-        )
-        graph_nodes = (
-            self.graph.number_of_nodes()
-            if not user_id
-            else len([node for node, data in self.graph.nodes(data=True) if data.get("user_id") == user_id])
-        )
-        graph_edges = (
-            self.graph.number_of_edges()
-            if not user_id
-            else len(
-                [
-                    1
-                    for _, _, data in self.graph.edges(data=True)
-                    if data.get("user_id") == user_id
-                ]
-            )
+        if not user_id:
+            total_memories = len(self.memories)
+            graph_nodes = self.graph.number_of_nodes()
+            graph_edges = self.graph.number_of_edges()
+        else:
+            total_memories = sum(1 for memory in self.memories.values() if memory.user_id == user_id)
+            graph_nodes = sum(1 for _, node_user in self.graph.nodes(data="user_id") if node_user == user_id)
+            graph_edges = sum(1 for _, _, edge_user in self.graph.edges(data="user_id") if edge_user == user_id)
+        
+        # Count relationships per type in a single pass
+        type_counts = Counter(
+            rel.relationship_type
+            for rel in self.relationships.values()
+            if not user_id or rel.user_id == user_id
         )
         return {
-            "total_memories": len(memories),
-            "total_relationships": total_relationships,
+            "total_memories": total_memories,
+            "total_relationships": sum(type_counts.values()),
             "graph_nodes": graph_nodes,
             "graph_edges": graph_edges,
-            "relationship_types": {
-                rt.value: sum(
-                    1
-                    for r in self.relationships.values()
-                    if r.relationship_type == rt and (not user_id or r.user_id == user_id)
-                )
-                for rt in RelationshipType
-            }
+            "relationship_types": {rt.value: type_counts[rt] for rt in RelationshipType}
         }
     
     def export_graph(self, user_id: Optional[str] = None) -> Dict[str, Any]:
@@ -374,9 +526,9 @@ class GraphStore:
             }
             # Include full memory metadata if available
             if memory:
-                # Use entities_by_type from metadata if available, otherwise convert flat entities list
-                if memory.metadata and "entities_by_type" in memory.metadata:
-                    node_export["entities"] = memory.metadata["entities_by_type"]
+                # Use entities_by_type if available, otherwise convert flat entities list
+                if memory.entities_by_type:
+                    node_export["entities"] = memory.entities_by_type
                 else:
                     # Fallback: convert flat entities list to dict format
                     node_export["entities"] = {"keywords": memory.entities if memory.entities else []}
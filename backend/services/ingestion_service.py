@@ -1,11 +1,16 @@
 """Ingestion service for processing documents into memories"""
 
-from typing import List, Optional
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 from datetime import datetime
+import asyncio
 import re
+import threading
+import weakref
+from itertools import accumulate, islice
 from fastapi import UploadFile
 from backend.models import Document, Memory, MemoryRelationship, RelationshipType, DocumentStatus
-from backend.services.embedding_service import get_embedding_service
+from backend.services.embedding_service import EmbeddingBatcher, get_embedding_service
 from backend.services.vector_store import get_vector_store
 from backend.services.graph_store import get_graph_store
 from backend.services.memory_tiering import get_memory_tiering
@@ -20,18 +25,68 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Common words excluded from keyword extraction
+_STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'is', 'was', 'are', 'were', 'been', 'be', 'have', 'has',
+    'had', 'do', 'does', 'did', 'will', 'would', 'should', 'could', 'may',
+    'might', 'must', 'can', 'this', 'that', 'these', 'those', 'i', 'you',
+    'he', 'she', 'it', 'we', 'they', 'what', 'which', 'who', 'when', 'where',
+    'why', 'how', 'as', 'by', 'from'
+})
+
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+_KEYWORD_RE = re.compile(r'\b[a-zA-Z]{3,}\b')
+_NUMBER_RE = re.compile(r'\d+')
+# Language suggesting new content updates earlier information
+_UPDATE_RE = re.compile(
+    r'\b(?:now|updated|changed|instead|no longer|switched|currently|revised|modified)\b',
+    re.IGNORECASE,
+)
+
+# Number of documents whose processing status is kept for polling
+_MAX_TRACKED_DOCUMENTS = 1000
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    """Yield successive lists of up to `size` items from an iterable."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
 
 class IngestionService:
     """Service for ingesting documents and creating memories"""
     
     def __init__(self):
         self.embedding_service = get_embedding_service()
+        # Single-chunk documents (link summaries, short notes) from concurrent
+        # ingests share one embedding batch
+        self.single_chunk_embedder = EmbeddingBatcher(
+            self.embedding_service,
+            window_seconds=settings.embedding_coalesce_window_ms / 1000,
+            max_batch=settings.ingest_batch_size,
+        )
         self.vector_store = get_vector_store()
         self.graph_store = get_graph_store()
         self.memory_tiering = get_memory_tiering()
         self.entity_service = get_entity_service()
         self.content_loader = get_content_loader()
         self.summarizer = get_summarization_service()
+        self.documents: "OrderedDict[str, Document]" = OrderedDict()  # Recently queued documents by ID, for status polling
+        self._background_tasks: Set[asyncio.Task] = set()
+        # Per-user ingest locks, dropped once no ingest holds or awaits them
+        self._user_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+    
+    def _user_lock(self, user_id: str) -> asyncio.Lock:
+        lock = self._user_locks.get(user_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._user_locks[user_id] = lock
+        return lock
     
     def chunk_text(self, text: str, chunk_size: int = None, overlap: int = None) -> List[str]:
         """
@@ -45,6 +100,20 @@ class IngestionService:
         Returns:
             List of text chunks
         """
+        return list(self.iter_chunks(text, chunk_size, overlap))
+    
+    def iter_chunks(self, text: str, chunk_size: int = None, overlap: int = None) -> Iterator[str]:
+        """
+        Lazily split text into chunks with overlap.
+        
+        Args:
+            text: Input text
+            chunk_size: Size of each chunk in characters
+            overlap: Overlap between chunks
+            
+        Yields:
+            Text chunks in document order
+        """
         chunk_size = chunk_size or settings.chunk_size
         overlap = overlap or settings.chunk_overlap
         
@@ -52,37 +121,35 @@ class IngestionService:
         text = text.strip()
         
         # Split into sentences (simple approach)
-        sentences = re.split(r'(?<=[.!?])\s+', text)
+        sentences = _SENTENCE_SPLIT_RE.split(text)
+        sentence_lengths = [len(sentence) for sentence in sentences]
         
-        chunks = []
-        current_chunk = []
+        # Prefix sums of sentence length + 1 (joining space), so the length of
+        # ' '.join(sentences[lo:hi]) is offsets[hi] - offsets[lo] - 1 without
+        # materializing the joined string.
+        offsets = [0, *accumulate(length + 1 for length in sentence_lengths)]
+        
+        chunk_start = 0  # Current chunk is sentences[chunk_start:idx]
         current_length = 0
         
-        for sentence in sentences:
-            sentence_length = len(sentence)
-            
-            # If adding this sentence exceeds chunk size, save current chunk
-            if current_length + sentence_length > chunk_size and current_chunk:
-                chunks.append(' '.join(current_chunk))
+        for idx, sentence_length in enumerate(sentence_lengths):
+            # If adding this sentence exceeds chunk size, emit current chunk
+            if current_length + sentence_length > chunk_size and idx > chunk_start:
+                yield ' '.join(sentences[chunk_start:idx])
                 
                 # Keep overlap sentences for next chunk
-                overlap_text = ' '.join(current_chunk)
-                if len(overlap_text) > overlap:
+                if offsets[idx] - offsets[chunk_start] - 1 > overlap:
                     # Start next chunk with part of previous chunk
-                    current_chunk = [sentence]
+                    chunk_start = idx
                     current_length = sentence_length
                 else:
-                    current_chunk = current_chunk[-1:] + [sentence] if current_chunk else [sentence]
-                    current_length = len(' '.join(current_chunk))
+                    chunk_start = idx - 1
+                    current_length = offsets[idx + 1] - offsets[chunk_start] - 1
             else:
-                current_chunk.append(sentence)
                 current_length += sentence_length + 1  # +1 for space
         
-        # Add remaining chunk
-        if current_chunk:
-            chunks.append(' '.join(current_chunk))
-        
-        return chunks if chunks else [text]
+        # Emit remaining chunk (split() always returns at least one sentence)
+        yield ' '.join(sentences[chunk_start:])
     
     def extract_keywords(self, text: str, max_keywords: int = 10) -> List[str]:
         """
@@ -95,32 +162,47 @@ class IngestionService:
         Returns:
             List of keywords
         """
-        # Simple keyword extraction - remove common words and get unique words
-        stop_words = {
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
-            'of', 'with', 'is', 'was', 'are', 'were', 'been', 'be', 'have', 'has',
-            'had', 'do', 'does', 'did', 'will', 'would', 'should', 'could', 'may',
-            'might', 'must', 'can', 'this', 'that', 'these', 'those', 'i', 'you',
-            'he', 'she', 'it', 'we', 'they', 'what', 'which', 'who', 'when', 'where',
-            'why', 'how', 'as', 'by', 'from'
-        }
-        
-        # Extract words
-        words = re.findall(r'\b[a-zA-Z]{3,}\b', text.lower())
-        
-        # Filter stop words and get unique words
-        keywords = []
-        seen = set()
-        for word in words:
-            if word not in stop_words and word not in seen:
-                keywords.append(word)
-                seen.add(word)
+        # Simple keyword extraction - remove common words and get unique words.
+        # Iterate matches lazily so the scan stops once enough keywords are found,
+        # and lowercase matched words only instead of copying the whole text.
+        # A dict keeps first-seen order while deduplicating.
+        keywords: Dict[str, None] = {}
+        for match in _KEYWORD_RE.finditer(text):
+            word = match.group().lower()
+            if word not in _STOP_WORDS and word not in keywords:
+                keywords[word] = None
                 if len(keywords) >= max_keywords:
                     break
         
-        return keywords
+        return list(keywords)
     
-    async def process_document(self, document: Document) -> List[Memory]:
+    def extract_keywords_batch(self, texts: List[str], max_keywords: int = 10) -> List[List[str]]:
+        """
+        Extract keywords from multiple texts.
+        
+        Args:
+            texts: Input texts
+            max_keywords: Maximum number of keywords per text
+            
+        Returns:
+            One keyword list per input text, in input order
+        """
+        return [self.extract_keywords(text, max_keywords) for text in texts]
+    
+    def _document_chunks(self, document: Document) -> Iterator[str]:
+        """Lazily chunk a document's content (link summaries stay one chunk)."""
+        # For link summaries, skip chunking - they're already concise
+        # Chunking would split coherent information unnecessarily
+        if document.document_type == "link" and "link_summary" in document.metadata:
+            logger.info(f"Skipping chunking for link summary (keeping as single memory)")
+            return iter([document.content])  # Single chunk = full summary
+        return self.iter_chunks(document.content)
+    
+    async def process_document(
+        self,
+        document: Document,
+        embeddings: Optional[Dict[str, List[float]]] = None,
+    ) -> List[Memory]:
         """
         Process a document into memories.
         
@@ -128,6 +210,8 @@ class IngestionService:
         
         Args:
             document: Document to process
+            embeddings: Precomputed embeddings by chunk text (chunks not found
+                here are embedded as usual)
             
         Returns:
             List of created memories
@@ -138,74 +222,61 @@ class IngestionService:
             # Update status: EXTRACTING
             document.status = DocumentStatus.EXTRACTING
             # In a real app, this is where we'd extract text from PDFs, images, etc.
-            content = document.content
             
             # Update status: CHUNKING
             document.status = DocumentStatus.CHUNKING
             
-            # For link summaries, skip chunking - they're already concise
-            # Chunking would split coherent information unnecessarily
-            if document.document_type == "link" and "link_summary" in document.metadata:
-                chunks = [content]  # Single chunk = full summary
-                logger.info(f"Skipping chunking for link summary (keeping as single memory)")
-            else:
-                chunks = self.chunk_text(content)
-                logger.info(f"Created {len(chunks)} chunks from document")
+            chunks = self._document_chunks(document)
             
-            # Update status: EMBEDDING
-            document.status = DocumentStatus.EMBEDDING
-            embeddings = self.embedding_service.embed_batch(chunks)
-            logger.info(f"Generated embeddings for {len(chunks)} chunks")
-            
-            # Create memories
-            memories = []
-            for idx, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                # Extract entities from chunk
-                entities_dict = self.entity_service.extract_entities(chunk)
-                entities_list = []
-                for entity_type, entity_set in entities_dict.items():
-                    entities_list.extend(entity_set)
+            # Indexing and relationship detection for a user run one document at a
+            # time: the memories become visible to other ingests as soon as they
+            # are indexed, and overlapping documents would otherwise match each
+            # other in both directions. The lock is only taken once the first
+            # micro-batch is embedded, so concurrent single-chunk ingests still
+            # coalesce in the embedding batcher (later micro-batches of a long
+            # document are embedded under the lock, keeping memory bounded).
+            lock = self._user_lock(document.user_id)
+            locked = False
+            try:
+                # Chunks are embedded and indexed in micro-batches so intermediate
+                # embeddings/entities never exist for the whole document at once
+                memories = []
+                for batch in chunked(chunks, settings.ingest_batch_size):
+                    # Update status: EMBEDDING
+                    document.status = DocumentStatus.EMBEDDING
+                    batch_memories = await self._build_memories(document, batch, len(memories), embeddings)
+                    
+                    if not locked:
+                        await lock.acquire()
+                        locked = True
+                    
+                    # Update status: INDEXING
+                    document.status = DocumentStatus.INDEXING
+                    
+                    # Add to graph store first (so they exist for relationship detection)
+                    self.graph_store.add_memories_batch(batch_memories)
+                    
+                    # Add to vector store (so they're searchable)
+                    await asyncio.to_thread(self.vector_store.add_memories_batch, batch_memories)
+                    
+                    # Classify memories into hot/cold tiers
+                    tiers = [self.memory_tiering.classify_memory(memory) for memory in batch_memories]
+                    self.memory_tiering.add_batch(batch_memories, tiers)
+                    
+                    memories.extend(batch_memories)
+                
+                document.memory_ids = [memory.id for memory in memories]
+                logger.info(f"Created and indexed {len(memories)} chunks from document")
+                
+                # Detect relationships with existing memories (now that new memories are in vector store).
+                # The user's memories are read once here and shared by both detectors.
+                user_id = memories[0].user_id if memories else None
+                existing_memories = self.graph_store.get_all_memories(user_id=user_id)
+                await self._detect_relationships(memories, existing_memories)
+            finally:
+                if locked:
+                    lock.release()
                 
-                memory = Memory(
-                    user_id=document.user_id,
-                    content=chunk,
-                    document_id=document.id,
-                    chunk_index=idx,
-                    embedding=embedding,
-                    embedding_model=settings.embedding_model,
-                    keywords=self.extract_keywords(chunk),
-                    entities=entities_list,
-                    metadata={
-                        "source": document.source,
-                        "document_type": document.document_type,
-                        "title": document.title,
-                        "entities_by_type": {k: list(v) for k, v in entities_dict.items()}
-                    }
-                )
-                memories.append(memory)
-                document.memory_ids.append(memory.id)
-            
-            # Update status: INDEXING
-            document.status = DocumentStatus.INDEXING
-            
-            # Add to graph store first (so they exist for relationship detection)
-            for memory in memories:
-                self.graph_store.add_memory(memory)
-            
-            # Add to vector store (so they're searchable)
-            self.vector_store.add_memories_batch(memories)
-            
-            # Classify memories into hot/cold tiers
-            for memory in memories:
-                tier = self.memory_tiering.classify_memory(memory)
-                if tier == 'hot':
-                    self.memory_tiering.add_to_hot(memory)
-                else:
-                    self.memory_tiering.add_to_cold(memory)
-            
-            # Detect relationships with existing memories (now that new memories are in vector store)
-            await self._detect_relationships(memories)
-            
             # Update status: DONE
             document.status = DocumentStatus.DONE
             document.processed_at = datetime.utcnow()
@@ -219,7 +290,158 @@ class IngestionService:
             document.error_message = str(e)
             raise
     
-    async def _detect_relationships(self, new_memories: List[Memory]):
+    async def _build_memories(
+        self,
+        document: Document,
+        batch: List[str],
+        start_index: int,
+        embeddings: Optional[Dict[str, List[float]]] = None,
+    ) -> List[Memory]:
+        """
+        Embed one micro-batch of chunks and build their memories (nothing is indexed).
+        
+        Args:
+            document: Document the chunks belong to
+            batch: Chunk texts
+            start_index: Chunk index of the first chunk in the document
+            embeddings: Precomputed embeddings by chunk text
+            
+        Returns:
+            One memory per chunk, in order
+        """
+        if embeddings is not None and all(chunk in embeddings for chunk in batch):
+            batch_embeddings = [embeddings[chunk] for chunk in batch]
+        elif len(batch) == 1 and start_index == 0:
+            batch_embeddings = [await self.single_chunk_embedder.embed(batch[0])]
+        else:
+            batch_embeddings = await self.embedding_service.aembed_batch(batch)
+        
+        # Extract entities and keywords for the batch up front
+        chunk_entities = self.entity_service.extract_entities_batch(batch)
+        chunk_keywords = self.extract_keywords_batch(batch)
+        
+        # Create memories
+        batch_memories = []
+        for idx, (chunk, embedding, entities_dict, keywords) in enumerate(
+            zip(batch, batch_embeddings, chunk_entities, chunk_keywords),
+            start=start_index,
+        ):
+            entities_list = []
+            for entity_type, entity_set in entities_dict.items():
+                entities_list.extend(entity_set)
+            
+            memory = Memory(
+                user_id=document.user_id,
+                content=chunk,
+                document_id=document.id,
+                chunk_index=idx,
+                embedding=embedding,
+                embedding_model=settings.embedding_model,
+                keywords=keywords,
+                entities=entities_list,
+                entities_by_type={k: list(v) for k, v in entities_dict.items()},
+                metadata={
+                    "source": document.source,
+                    "document_type": document.document_type,
+                    "title": document.title,
+                }
+            )
+            batch_memories.append(memory)
+        return batch_memories
+    
+    async def process_documents(self, documents: List[Document]) -> List[Document]:
+        """
+        Process several documents in order.
+        
+        Single-chunk documents are embedded together in one model call up front;
+        indexing and relationship detection then run one document at a time, so
+        each document only links to the ones before it. A failed document is
+        left in FAILED status and does not stop the rest.
+        
+        Args:
+            documents: Documents to process, in order
+            
+        Returns:
+            The processed documents
+        """
+        single_chunks = []
+        for document in documents:
+            chunks = list(islice(self._document_chunks(document), 2))
+            if len(chunks) == 1:
+                single_chunks.append(chunks[0])
+        
+        embeddings = None
+        if len(single_chunks) > 1:
+            texts = list(dict.fromkeys(single_chunks))
+            embeddings = dict(zip(texts, await self.embedding_service.aembed_batch(texts)))
+        
+        for document in documents:
+            try:
+                await self.process_document(document, embeddings=embeddings)
+            except Exception:
+                # process_document already recorded FAILED status and the error message
+                pass
+        return documents
+    
+    def enqueue_document(self, document: Document) -> Document:
+        """
+        Schedule a document for processing on the event loop and return immediately.
+        
+        The document stays in QUEUED status until the background task picks it up;
+        callers can poll get_document() for progress.
+        
+        Args:
+            document: Document to process
+            
+        Returns:
+            The queued document
+        """
+        self.enqueue_documents([document])
+        return document
+    
+    def enqueue_documents(self, documents: List[Document]) -> List[Document]:
+        """
+        Schedule documents for in-order processing on the event loop and return immediately.
+        
+        Args:
+            documents: Documents to process, in order
+            
+        Returns:
+            The queued documents
+        """
+        for document in documents:
+            document.status = DocumentStatus.QUEUED
+            self._track_document(document)
+        task = asyncio.create_task(self._process_in_background(documents))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        logger.info(f"Queued {len(documents)} documents for background processing")
+        return documents
+    
+    async def _process_in_background(self, documents: List[Document]):
+        try:
+            await self.process_documents(documents)
+        finally:
+            # Tracked documents are only polled for status; don't keep their bodies
+            for document in documents:
+                document.content = ""
+    
+    def _track_document(self, document: Document):
+        self.documents[document.id] = document
+        self.documents.move_to_end(document.id)
+        while len(self.documents) > _MAX_TRACKED_DOCUMENTS:
+            self.documents.popitem(last=False)
+    
+    def get_document(self, document_id: str, user_id: Optional[str] = None) -> Optional[Document]:
+        """Get a recently queued document by ID (optionally scoped to a user)"""
+        document = self.documents.get(document_id)
+        if not document:
+            return None
+        if user_id and document.user_id != user_id:
+            return None
+        return document
+    
+    async def _detect_relationships(self, new_memories: List[Memory], existing_memories: List[Memory]):
         """
         Detect relationships between new memories and existing ones.
         
@@ -230,24 +452,30 @@ class IngestionService:
         
         Args:
             new_memories: Newly created memories
+            existing_memories: All of the user's memories in the graph store
         """
         logger.info(f"Detecting relationships for {len(new_memories)} new memories")
         
         user_id = new_memories[0].user_id if new_memories else None
-        existing_memories = self.graph_store.get_all_memories(user_id=user_id)
         
-        for new_memory in new_memories:
-            # Search for similar existing memories
-            if not new_memory.embedding:
-                continue
-            
-            similar_results = self.vector_store.search(
-                query_vector=new_memory.embedding,
-                limit=5,
-                score_threshold=0.55,  # Only consider somewhat similar memories
-                user_id=new_memory.user_id,
-            )
-            
+        # Search for similar existing memories for all new memories in one request
+        searchable = [memory for memory in new_memories if memory.embedding]
+        batch_results = await asyncio.to_thread(
+            self.vector_store.search_batch,
+            query_vectors=[memory.embedding for memory in searchable],
+            limit=5,
+            score_threshold=0.55,  # Only consider somewhat similar memories
+            user_id=user_id,
+        )
+        
+        # Look up every hit in one graph store call
+        memories_by_id = self.graph_store.get_memories_batch(
+            list({result["id"] for similar_results in batch_results for result in similar_results})
+        )
+        
+        relationships = []
+        outdated_ids = []
+        for new_memory, similar_results in zip(searchable, batch_results):
             for result in similar_results:
                 existing_memory_id = result["id"]
                 similarity_score = result["score"]
@@ -256,7 +484,7 @@ class IngestionService:
                 if existing_memory_id == new_memory.id:
                     continue
                 
-                existing_memory = self.graph_store.get_memory(existing_memory_id)
+                existing_memory = memories_by_id.get(existing_memory_id)
                 if not existing_memory or existing_memory.document_id == new_memory.document_id:
                     continue
                 
@@ -266,14 +494,27 @@ class IngestionService:
                 )
                 
                 if relationship:
-                    self.graph_store.add_relationship(relationship)
+                    if relationship.relationship_type == RelationshipType.UPDATES:
+                        outdated_ids.append(existing_memory_id)
+                    relationships.append(relationship)
                     logger.debug(
                         f"Created {relationship.relationship_type.value} relationship: "
                         f"{new_memory.id} -> {existing_memory_id} (score: {similarity_score:.2f})"
                     )
         
+        # Add the discovered relationships, persisting them in one batch off
+        # the event loop
+        added = self.graph_store.add_relationships_batch(relationships, persist=False)
+        await asyncio.to_thread(self.graph_store.persist_relationships, added)
+        
+        # Mark updated memories as outdated, writing the flags in one batch
+        # off the event loop
+        if outdated_ids:
+            marked = self.graph_store.mark_memories_outdated(outdated_ids, persist=False)
+            await asyncio.to_thread(self.graph_store.persist_outdated, marked)
+        
         # Implement basic DERIVES relationships using pattern detection
-        await self._detect_derives_relationships(new_memories)
+        await self._detect_derives_relationships(new_memories, existing_memories)
     
     def _clamp_confidence(self, value: Optional[float]) -> Optional[float]:
         if value is None:
@@ -299,9 +540,7 @@ class IngestionService:
         if similarity_score >= settings.similarity_threshold_update:
             # Check if content contradicts or updates
             if self._has_contradictory_info(new_memory.content, existing_memory.content):
-                # Mark existing as outdated
-                self.graph_store.mark_memory_outdated(existing_memory.id)
-                
+                # Existing memory is marked outdated by the caller
                 return MemoryRelationship(
                     user_id=new_memory.user_id,
                     from_memory_id=new_memory.id,
@@ -365,30 +604,58 @@ class IngestionService:
         Detect if new content contradicts existing content.
         Simple heuristic: look for update keywords and changed numbers/facts.
         """
-        update_keywords = [
-            'now', 'updated', 'changed', 'instead', 'no longer',
-            'switched', 'currently', 'revised', 'modified'
-        ]
+        # Check for explicit update language
+        if _UPDATE_RE.search(new_content):
+            return True
         
-        new_lower = new_content.lower()
+        # If contents are very different in numbers, might be an update
+        existing_numbers = set(_NUMBER_RE.findall(existing_content))
+        if not existing_numbers:
+            return False
         
-        # Check for explicit update language
-        for keyword in update_keywords:
-            if keyword in new_lower:
+        new_numbers = set()
+        for match in _NUMBER_RE.finditer(new_content):
+            number = match.group()
+            if number not in existing_numbers:
+                # Different numbers might indicate an update
                 return True
+            new_numbers.add(number)
         
-        # If contents are very different in numbers, might be an update
-        import re
-        new_numbers = set(re.findall(r'\d+', new_content))
-        existing_numbers = set(re.findall(r'\d+', existing_content))
+        return bool(new_numbers) and new_numbers != existing_numbers
+    
+    def _get_memory_entities(self, memory: Memory) -> Dict[str, Set[str]]:
+        """Entities stored on a memory at ingest, extracted from content if missing."""
+        if memory.entities_by_type:
+            return {entity_type: set(values) for entity_type, values in memory.entities_by_type.items()}
+        return self.entity_service.extract_entities(memory.content)
+    
+    def _build_derive_index(
+        self,
+        memories: List[Memory],
+        memory_entities: List[Dict[str, Set[str]]],
+    ) -> Tuple[Dict[Tuple[str, str], Set[int]], Dict[str, Set[int]]]:
+        """
+        Build inverted indexes from entities and keywords to positions in `memories`.
         
-        if new_numbers and existing_numbers and new_numbers != existing_numbers:
-            # Different numbers might indicate an update
-            return True
+        Entity types with zero similarity weight are skipped since sharing them
+        cannot contribute to a DERIVES relationship.
+        """
+        weights = self.entity_service.ENTITY_WEIGHTS
+        entity_index: Dict[Tuple[str, str], Set[int]] = defaultdict(set)
+        keyword_index: Dict[str, Set[int]] = defaultdict(set)
         
-        return False
+        for position, (memory, entities) in enumerate(zip(memories, memory_entities)):
+            for entity_type, values in entities.items():
+                if not weights.get(entity_type):
+                    continue
+                for value in values:
+                    entity_index[(entity_type, value)].add(position)
+            for keyword in memory.keywords:
+                keyword_index[keyword].add(position)
+        
+        return entity_index, keyword_index
     
-    async def _detect_derives_relationships(self, new_memories: List[Memory]):
+    async def _detect_derives_relationships(self, new_memories: List[Memory], all_memories: List[Memory]):
         """
         Detect DERIVES relationships using entity-based analysis.
         
@@ -400,33 +667,47 @@ class IngestionService:
         This is more accurate than keyword-only matching.
         """
         user_id = new_memories[0].user_id if new_memories else None
-        all_memories = self.graph_store.get_all_memories(user_id=user_id)
         
+        # Index entities stored on existing memories, so each new memory is only
+        # compared with memories sharing an entity or keyword
+        all_entities = [self._get_memory_entities(memory) for memory in all_memories]
+        entity_index, keyword_index = self._build_derive_index(all_memories, all_entities)
+        
+        # Edges are added to the graph immediately (later memories must see
+        # them) and persisted together at the end
+        derived = []
         for new_memory in new_memories:
-            # Extract entities from new memory
-            new_entities = self.entity_service.extract_entities(new_memory.content)
+            # Entities were extracted when the memory was created
+            new_entities = self._get_memory_entities(new_memory)
             new_keywords = set(new_memory.keywords)
             
-            for existing_memory in all_memories:
+            # Without a shared weighted entity or keyword neither DERIVES criterion can match
+            candidates: Set[int] = set()
+            for entity_type, entities in new_entities.items():
+                for entity in entities:
+                    candidates.update(entity_index.get((entity_type, entity), ()))
+            for keyword in new_keywords:
+                candidates.update(keyword_index.get(keyword, ()))
+            
+            # Memories already related to this one, fetched once rather than per candidate
+            existing_relationships = self.graph_store.get_relationships(
+                new_memory.id,
+                direction="both",
+                user_id=user_id,
+            )
+            related_ids = {rel.to_memory_id for rel in existing_relationships}
+            related_ids.update(rel.from_memory_id for rel in existing_relationships)
+            
+            for position in sorted(candidates):
+                existing_memory = all_memories[position]
                 if existing_memory.id == new_memory.id:
                     continue
                 
                 # Check if already related
-                existing_relationships = self.graph_store.get_relationships(
-                    new_memory.id,
-                    direction="both",
-                    user_id=user_id,
-                )
-                already_related = any(
-                    rel.to_memory_id == existing_memory.id or rel.from_memory_id == existing_memory.id
-                    for rel in existing_relationships
-                )
-                
-                if already_related:
+                if existing_memory.id in related_ids:
                     continue
                 
-                # Extract entities from existing memory
-                existing_entities = self.entity_service.extract_entities(existing_memory.content)
+                existing_entities = all_entities[position]
                 existing_keywords = set(existing_memory.keywords)
                 
                 # Calculate entity-based similarity
@@ -481,11 +762,14 @@ class IngestionService:
                         reason=reason
                     )
                     
-                    self.graph_store.add_relationship(relationship)
+                    if self.graph_store.add_relationship(relationship, persist=False):
+                        derived.append(relationship)
                     logger.debug(
                         f"Created DERIVES relationship: {new_memory.id} -> {existing_memory.id} "
                         f"(entity_sim: {entity_similarity:.2f}, keyword_overlap: {keyword_overlap:.2f})"
                     )
+        
+        await asyncio.to_thread(self.graph_store.persist_relationships, derived)
     
     async def ingest_entry(
         self,
@@ -498,8 +782,88 @@ class IngestionService:
         link_url: Optional[str],
         upload_file: Optional[UploadFile],
         explicit_source: Optional[str] = None,
+        background: bool = False,
+    ) -> Document:
+        """
+        Normalize note/link/file submissions into a document and process it.
+        
+        When background is True the document is returned as soon as it is queued
+        and processed off the request path; otherwise processing completes first.
+        """
+        document = await self.prepare_entry(
+            user_id=user_id,
+            entry_type=entry_type,
+            title=title,
+            description=description,
+            note_content=note_content,
+            link_url=link_url,
+            upload_file=upload_file,
+            explicit_source=explicit_source,
+        )
+        if background:
+            return self.enqueue_document(document)
+        
+        await self.process_document(document)
+        return document
+
+    async def ingest_entries(
+        self,
+        *,
+        user_id: str,
+        entries: List[Dict[str, Any]],
+        background: bool = False,
+    ) -> List[Union[Document, Exception]]:
+        """
+        Normalize several note/link submissions into documents and process them.
+        
+        Links are fetched/summarized concurrently (at most
+        ingest_batch_fetch_concurrency at a time); the documents are then
+        processed in list order (see process_documents). One entry failing
+        does not fail the others.
+        
+        Args:
+            user_id: Owner of the documents
+            entries: prepare_entry keyword arguments (without user_id), one per entry
+            background: Return once queued instead of after processing
+            
+        Returns:
+            Per entry, in order: its document (FAILED status if processing
+            failed) or the exception raised while preparing it
+        """
+        semaphore = asyncio.Semaphore(max(1, settings.ingest_batch_fetch_concurrency))
+        
+        async def _prepare(entry: Dict[str, Any]) -> Document:
+            async with semaphore:
+                return await self.prepare_entry(user_id=user_id, **entry)
+        
+        results = await asyncio.gather(
+            *(_prepare(entry) for entry in entries),
+            return_exceptions=True,
+        )
+        documents = [result for result in results if isinstance(result, Document)]
+        if background:
+            self.enqueue_documents(documents)
+        else:
+            await self.process_documents(documents)
+        return results
+
+    async def prepare_entry(
+        self,
+        *,
+        user_id: str,
+        entry_type: str,
+        title: Optional[str],
+        description: Optional[str],
+        note_content: Optional[str],
+        link_url: Optional[str],
+        upload_file: Optional[UploadFile] = None,
+        explicit_source: Optional[str] = None,
     ) -> Document:
-        """Normalize note/link/file submissions into a document."""
+        """
+        Normalize a note/link/file submission into an unprocessed document.
+        
+        Links are fetched (and summarized when a summarizer is configured) here.
+        """
         entry_type = (entry_type or "note").lower()
         metadata = {
             "ingest_type": entry_type,
@@ -568,8 +932,6 @@ class IngestionService:
             document_type=entry_type,
             metadata=metadata,
         )
-
-        await self.process_document(document)
         return document
 
     async def ingest_text(
@@ -596,12 +958,15 @@ class IngestionService:
 
 # Global instance
 _ingestion_service = None
+_ingestion_lock = threading.Lock()
 
 
 def get_ingestion_service() -> IngestionService:
     """Get singleton ingestion service instance"""
     global _ingestion_service
     if _ingestion_service is None:
-        _ingestion_service = IngestionService()
+        with _ingestion_lock:
+            if _ingestion_service is None:
+                _ingestion_service = IngestionService()
     return _ingestion_service
 
@@ -1,7 +1,11 @@
 """Memory tiering service for hot/cold storage management"""
 
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any, Tuple
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
+import asyncio
+import heapq
+import threading
 from backend.models import Memory
 from backend.config import settings
 import logging
@@ -16,7 +20,9 @@ class MemoryTiering:
         self,
         hot_age_days: Optional[int] = None,
         hot_access_threshold: Optional[int] = None,
-        cold_storage_enabled: Optional[bool] = None
+        cold_storage_enabled: Optional[bool] = None,
+        cold_max_size: Optional[int] = None,
+        on_evict: Optional[Callable[[List[Memory]], None]] = None,
     ):
         """
         Initialize memory tiering.
@@ -25,12 +31,29 @@ class MemoryTiering:
             hot_age_days: Memories younger than this are considered "hot"
             hot_access_threshold: Memories accessed more than this are "hot"
             cold_storage_enabled: Whether to use cold storage tier
+            cold_max_size: Max memories kept in the cold tier (0 = unbounded)
+            on_evict: Called with memories evicted from the cold tier before they are dropped
         """
         self.hot_age_days = hot_age_days or settings.hot_memory_age_days
         self.hot_access_threshold = hot_access_threshold or settings.hot_memory_access_threshold
         self.cold_storage_enabled = cold_storage_enabled if cold_storage_enabled is not None else settings.cold_storage_enabled
+        self.cold_max_size = cold_max_size if cold_max_size is not None else settings.cold_tier_max_size
+        self.on_evict = on_evict
         self.hot_memories: Dict[str, Memory] = {}  # Fast-access layer
         self.cold_memories: Dict[str, Memory] = {}  # Archived layer
+        # Min-heap of (created_at, id) for hot memories, so rebalancing only visits
+        # memories old enough to be demoted. Entries for memories that have left
+        # the hot tier are skipped when popped.
+        self._hot_by_age: List[Tuple[datetime, str]] = []
+        # Hot memories accessed again while already hot, in LRU order. Memories
+        # entering the hot tier start inactive, so one-off reads (scans) cannot
+        # displace memories that are reused; active ones survive one extra
+        # rebalance before demotion.
+        self._hot_active: "OrderedDict[str, None]" = OrderedDict()
+        # Promotions requested on the read path, applied together off the request
+        self._promotion_queue: "deque[str]" = deque()
+        self._promotion_lock = threading.Lock()
+        self._promotion_flush: Optional[asyncio.TimerHandle] = None
     
     def classify_memory(self, memory: Memory) -> str:
         """
@@ -56,9 +79,16 @@ class MemoryTiering:
         else:
             return 'cold'
     
+    def _track_hot_age(self, memory: Memory):
+        heapq.heappush(self._hot_by_age, (memory.created_at, memory.id))
+    
     def add_to_hot(self, memory: Memory):
         """Add memory to hot storage"""
+        previous = self.hot_memories.get(memory.id)
         self.hot_memories[memory.id] = memory
+        # An already-hot memory keeps its existing age entry
+        if previous is None or previous.created_at != memory.created_at:
+            self._track_hot_age(memory)
         # Remove from cold if it was there
         self.cold_memories.pop(memory.id, None)
         logger.debug(f"Added memory to hot tier: {memory.id}")
@@ -69,12 +99,56 @@ class MemoryTiering:
             self.cold_memories[memory.id] = memory
             # Remove from hot
             self.hot_memories.pop(memory.id, None)
+            self._hot_active.pop(memory.id, None)
             logger.debug(f"Added memory to cold tier: {memory.id}")
     
+    def add_batch(self, memories: List[Memory], tiers: List[str]):
+        """
+        Add multiple memories to their classified tiers.
+        
+        Args:
+            memories: Memories to add
+            tiers: 'hot' or 'cold' for each memory, as returned by classify_memory
+        """
+        hot = {}
+        cold = {}
+        for memory, tier in zip(memories, tiers):
+            if tier == 'cold' and self.cold_storage_enabled:
+                cold[memory.id] = memory
+            else:
+                hot[memory.id] = memory
+        
+        # An already-hot memory keeps its existing age entry
+        untracked = []
+        for memory_id, memory in hot.items():
+            self.cold_memories.pop(memory_id, None)
+            previous = self.hot_memories.get(memory_id)
+            if previous is None or previous.created_at != memory.created_at:
+                untracked.append(memory)
+        for memory_id in cold:
+            self.hot_memories.pop(memory_id, None)
+            self._hot_active.pop(memory_id, None)
+        self.hot_memories.update(hot)
+        self.cold_memories.update(cold)
+        for memory in untracked:
+            self._track_hot_age(memory)
+        logger.debug(f"Added {len(hot)} memories to hot tier, {len(cold)} to cold tier")
+    
+    def _activate(self, memory_id: str):
+        """Move a hot memory to the MRU end of the active segment."""
+        self._hot_active[memory_id] = None
+        self._hot_active.move_to_end(memory_id)
+        # Keep the active segment to at most half of the hot tier
+        while len(self._hot_active) > max(1, len(self.hot_memories) // 2):
+            self._hot_active.popitem(last=False)
+    
     def promote_to_hot(self, memory_id: str) -> bool:
         """
         Promote memory from cold to hot (e.g., when accessed).
         
+        A cold memory enters the inactive part of the hot tier; accessing a
+        memory that is already hot marks it active.
+        
         Args:
             memory_id: Memory ID to promote
             
@@ -84,10 +158,64 @@ class MemoryTiering:
         if memory_id in self.cold_memories:
             memory = self.cold_memories.pop(memory_id)
             self.hot_memories[memory_id] = memory
+            self._track_hot_age(memory)
             logger.debug(f"Promoted memory to hot tier: {memory_id}")
             return True
+        if memory_id in self.hot_memories:
+            self._activate(memory_id)
         return False
     
+    def record_access(self, memory: Memory, accessed_at: Optional[datetime] = None):
+        """
+        Record a read of a memory and queue its promotion to the hot tier.
+        
+        Args:
+            memory: Memory that was accessed
+            accessed_at: Access time (current UTC time if not provided)
+        """
+        memory.accessed_at = accessed_at or datetime.utcnow()
+        memory.access_count += 1
+        self.queue_promotion(memory.id)
+    
+    def queue_promotion(self, memory_id: str):
+        """
+        Request promotion of a memory to the hot tier without applying it now.
+        
+        Queued promotions are applied together shortly afterwards on the event
+        loop, or immediately when called outside of one.
+        
+        Args:
+            memory_id: Memory ID to promote
+        """
+        self._promotion_queue.append(memory_id)
+        if self._promotion_flush is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.apply_promotions()
+            return
+        self._promotion_flush = loop.call_later(
+            settings.tier_promotion_flush_ms / 1000, self.apply_promotions
+        )
+    
+    def apply_promotions(self) -> int:
+        """
+        Apply all queued promotions in one pass.
+        
+        Returns:
+            Number of memories moved from cold to hot
+        """
+        with self._promotion_lock:
+            self._promotion_flush = None
+            promoted = 0
+            while self._promotion_queue:
+                if self.promote_to_hot(self._promotion_queue.popleft()):
+                    promoted += 1
+        if promoted:
+            logger.debug(f"Applied {promoted} queued promotions to hot tier")
+        return promoted
+    
     def get_memory(self, memory_id: str) -> Optional[Memory]:
         """
         Get memory from either hot or cold tier.
@@ -100,51 +228,127 @@ class MemoryTiering:
             Memory or None
         """
         # Check hot first (faster)
-        if memory_id in self.hot_memories:
-            return self.hot_memories[memory_id]
+        memory = self.hot_memories.get(memory_id)
+        if memory is not None:
+            self._activate(memory_id)
+            return memory
         
-        # Check cold
-        if memory_id in self.cold_memories:
-            self.promote_to_hot(memory_id)
-            return self.cold_memories.get(memory_id) or self.hot_memories.get(memory_id)
-        
-        return None
+        # Check cold, promoting on hit
+        memory = self.cold_memories.pop(memory_id, None)
+        if memory is not None:
+            self.hot_memories[memory_id] = memory
+            self._track_hot_age(memory)
+            logger.debug(f"Promoted memory to hot tier: {memory_id}")
+        return memory
     
     def rebalance_tiers(self) -> Dict[str, int]:
         """
         Rebalance memories between hot and cold tiers based on current criteria.
-        Should be called periodically (e.g., daily).
+        Runs periodically via rebalance_periodically (see tier_rebalance_interval_minutes).
         
         Returns:
             Statistics: {promoted: count, demoted: count}
         """
+        self.apply_promotions()
         promoted_count = 0
         demoted_count = 0
         
-        # Check hot memories for demotion
-        hot_ids = list(self.hot_memories.keys())
-        for memory_id in hot_ids:
-            memory = self.hot_memories[memory_id]
-            if self.classify_memory(memory) == 'cold':
-                self.add_to_cold(memory)
-                demoted_count += 1
-        
-        # Check cold memories for promotion
-        cold_ids = list(self.cold_memories.keys())
-        for memory_id in cold_ids:
-            memory = self.cold_memories[memory_id]
-            if self.classify_memory(memory) == 'hot':
-                self.add_to_hot(memory)
-                promoted_count += 1
+        if not self.cold_storage_enabled:
+            return {"promoted": 0, "demoted": 0, "evicted": 0}
+        
+        # A memory stops being recent once (now - created_at).days > hot_age_days
+        cutoff = datetime.utcnow() - timedelta(days=self.hot_age_days + 1)
+        
+        # Check hot memories old enough for demotion, oldest first. A memory
+        # that left and re-entered the hot tier can have several entries;
+        # only the first one popped in this pass is considered.
+        deactivated = []
+        seen = set()
+        while self._hot_by_age and self._hot_by_age[0][0] <= cutoff:
+            created_at, memory_id = heapq.heappop(self._hot_by_age)
+            memory = self.hot_memories.get(memory_id)
+            if memory is None or memory.created_at != created_at or memory_id in seen:
+                continue  # Stale or duplicate entry
+            seen.add(memory_id)
+            # Frequently accessed memories stay hot; access counts only grow,
+            # so they no longer need age tracking
+            if memory.access_count >= self.hot_access_threshold:
+                continue
+            if memory_id in self._hot_active:
+                # Recently reused: drop to inactive and reconsider next rebalance
+                del self._hot_active[memory_id]
+                deactivated.append((created_at, memory_id))
+                continue
+            self.add_to_cold(memory)
+            demoted_count += 1
+        for entry in deactivated:
+            heapq.heappush(self._hot_by_age, entry)
+        
+        # Cold memories are past the age cutoff, so only access counts can promote them.
+        # Plan the moves in one pass, then apply them as a bulk update.
+        promote = {
+            memory_id: memory for memory_id, memory in self.cold_memories.items()
+            if memory.access_count >= self.hot_access_threshold
+        }
+        for memory_id in promote:
+            del self.cold_memories[memory_id]
+        self.hot_memories.update(promote)
+        for memory in promote.values():
+            self._track_hot_age(memory)
+        promoted_count += len(promote)
+        
+        evicted_count = self._evict_cold()
         
         logger.info(
-            f"Rebalanced tiers: {promoted_count} promoted, {demoted_count} demoted"
+            f"Rebalanced tiers: {promoted_count} promoted, {demoted_count} demoted, "
+            f"{evicted_count} evicted"
         )
         return {
             "promoted": promoted_count,
-            "demoted": demoted_count
+            "demoted": demoted_count,
+            "evicted": evicted_count
         }
     
+    def _evict_cold(self) -> int:
+        """
+        Drop the least accessed (then oldest) cold memories beyond cold_max_size.
+        
+        Evicted memories are only removed from tiering; they remain in the
+        graph and vector stores.
+        
+        Returns:
+            Number of memories evicted
+        """
+        excess = len(self.cold_memories) - self.cold_max_size
+        if self.cold_max_size <= 0 or excess <= 0:
+            return 0
+        
+        evicted = heapq.nsmallest(
+            excess,
+            self.cold_memories.values(),
+            key=lambda memory: (memory.access_count, memory.created_at),
+        )
+        if self.on_evict:
+            self.on_evict(evicted)
+        for memory in evicted:
+            del self.cold_memories[memory.id]
+        return len(evicted)
+    
+    async def rebalance_periodically(self, interval_seconds: float):
+        """
+        Call rebalance_tiers every interval_seconds until cancelled.
+        
+        Args:
+            interval_seconds: Delay between rebalances
+        """
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                self.rebalance_tiers()
+            except Exception as exc:
+                # Nothing is dropped when the eviction hook fails; retry next time
+                logger.error(f"Error rebalancing memory tiers: {exc}")
+    
     def get_hot_memories(self) -> List[Memory]:
         """Get all hot memories"""
         return list(self.hot_memories.values())
@@ -155,9 +359,11 @@ class MemoryTiering:
     
     def get_tier_stats(self) -> Dict[str, Any]:
         """Get statistics about tier distribution"""
+        self.apply_promotions()
         total = len(self.hot_memories) + len(self.cold_memories)
         return {
             "hot_count": len(self.hot_memories),
+            "hot_active_count": len(self._hot_active),
             "cold_count": len(self.cold_memories),
             "total_count": total,
             "hot_percentage": (len(self.hot_memories) / total * 100) if total > 0 else 0,
@@ -169,6 +375,16 @@ class MemoryTiering:
         for memory_id in memory_ids:
             self.hot_memories.pop(memory_id, None)
             self.cold_memories.pop(memory_id, None)
+            self._hot_active.pop(memory_id, None)
+
+
+def _append_evicted_ids(path: str) -> Callable[[List[Memory]], None]:
+    """Build an on_evict hook that appends evicted memory IDs to a file, one per line."""
+    def append(memories: List[Memory]):
+        with open(path, "a", encoding="utf-8") as log_file:
+            log_file.writelines(f"{memory.id}\n" for memory in memories)
+        logger.info(f"Recorded {len(memories)} evicted memory IDs in {path}")
+    return append
 
 
 # Global instance
@@ -179,5 +395,8 @@ def get_memory_tiering() -> MemoryTiering:
     """Get singleton memory tiering instance"""
     global _memory_tiering
     if _memory_tiering is None:
-        _memory_tiering = MemoryTiering()
+        on_evict = None
+        if settings.cold_tier_eviction_log:
+            on_evict = _append_evicted_ids(settings.cold_tier_eviction_log)
+        _memory_tiering = MemoryTiering(on_evict=on_evict)
     return _memory_tiering
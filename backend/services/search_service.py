@@ -2,10 +2,12 @@
 
 from typing import List, Optional
 from datetime import datetime
+import asyncio
+import heapq
 import math
 from backend.models import SearchQuery, SearchResult, Memory
 from backend.services.embedding_service import get_embedding_service
-from backend.services.vector_store import get_vector_store
+from backend.services.vector_store import get_vector_store, parse_payload_datetime
 from backend.services.graph_store import get_graph_store
 from backend.services.memory_tiering import get_memory_tiering
 from backend.config import settings
@@ -13,6 +15,9 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Ages (in days) covered by the precomputed time-decay table
+_DECAY_TABLE_DAYS = 4000
+
 
 class SearchService:
     """Service for searching and retrieving memories"""
@@ -22,6 +27,11 @@ class SearchService:
         self.vector_store = get_vector_store()
         self.graph_store = get_graph_store()
         self.memory_tiering = get_memory_tiering()
+        # Decay factors by whole-day age for the configured half-life
+        self._decay_table = [
+            math.exp(-age_days / settings.time_decay_half_life_days)
+            for age_days in range(_DECAY_TABLE_DAYS)
+        ]
     
     async def search(self, query: SearchQuery, user_id: str) -> List[SearchResult]:
         """
@@ -35,29 +45,47 @@ class SearchService:
         """
         logger.info(f"Searching for: {query.query}")
         
-        # Generate query embedding for semantic search
-        query_embedding = self.embedding_service.embed_text(query.query)
+        # Generate query embedding for semantic search. Whitespace is normalized
+        # (the tokenizer ignores it) so repeated queries hit the embedding cache.
+        query_embedding = self.embedding_service.embed_text(" ".join(query.query.split()))
         logger.debug(f"Query embedding generated: {len(query_embedding)} dimensions")
         
-        # Semantic search using vector store
-        # Use lower threshold to get results, filter by similarity_threshold later
-        vector_results = self.vector_store.search(
+        # Semantic search using vector store. The similarity threshold and
+        # latest/active flags are applied by Qdrant so discarded hits never come back.
+        vector_filters = {}
+        if query.only_latest:
+            vector_filters["is_latest"] = True
+        if not query.include_inactive:
+            vector_filters["is_active"] = True
+        vector_results = await asyncio.to_thread(
+            self.vector_store.search,
             query_vector=query_embedding,
             limit=query.limit * 2,  # Get more results for filtering
-            score_threshold=None,  # No threshold, we'll filter manually
+            score_threshold=query.similarity_threshold,
+            filters=vector_filters or None,
             user_id=user_id,
         )
         logger.info(f"Vector store returned {len(vector_results)} results")
         
-        # Build search results
-        results = []
+        # Fetch all hits from the graph store in one call
+        memories_by_id = self.graph_store.get_memories_batch(
+            [result["id"] for result in vector_results],
+            user_id=user_id,
+        )
+        
+        # Query keywords are the same for every hit
+        query_keywords_set = {kw.lower() for kw in query.keywords} if query.keywords else set()
+        
+        # Score and filter hits
+        now = datetime.utcnow()
+        scored = []
         for result in vector_results:
             memory_id = result["id"]
             vector_score = result["score"]
             payload = result["payload"]
             
             # Get full memory from graph store, or reconstruct from payload
-            memory = self.graph_store.get_memory(memory_id, user_id=user_id)
+            memory = memories_by_id.get(memory_id)
             if not memory:
                 # Reconstruct memory from vector store payload
                 try:
@@ -74,7 +102,9 @@ class SearchService:
                         is_active=payload.get("is_active", True),
                         keywords=payload.get("keywords", []),
                         entities=payload.get("entities", []),
-                        created_at=datetime.fromisoformat(payload.get("created_at", datetime.utcnow().isoformat())),
+                        entities_by_type=payload.get("entities_by_type")
+                        or payload.get("metadata", {}).get("entities_by_type", {}),
+                        created_at=parse_payload_datetime(payload.get("created_at")) or now,
                         metadata=payload.get("metadata", {})
                     )
                 except Exception as e:
@@ -84,7 +114,8 @@ class SearchService:
             if memory.user_id != user_id:
                 continue
             
-            # Apply filters
+            # Re-check flags against the graph store, which is authoritative
+            # (payloads written before is_latest was synced may be stale)
             if query.only_latest and not memory.is_latest:
                 continue
             
@@ -93,19 +124,13 @@ class SearchService:
             
             # Keyword matching (simple approach)
             keyword_score = 0.0
-            if query.keywords:
-                query_keywords_set = set(kw.lower() for kw in query.keywords)
-                memory_keywords_set = set(kw.lower() for kw in memory.keywords)
+            if query_keywords_set:
+                memory_keywords_set = {kw.lower() for kw in memory.keywords}
                 
-                # Jaccard similarity
-                intersection = query_keywords_set & memory_keywords_set
-                union = query_keywords_set | memory_keywords_set
-                keyword_score = len(intersection) / len(union) if union else 0.0
-            
-            # Apply similarity threshold filter
-            if vector_score < query.similarity_threshold:
-                logger.debug(f"Skipping result {memory_id}: score {vector_score} < threshold {query.similarity_threshold}")
-                continue
+                # Jaccard similarity (|A ∪ B| = |A| + |B| - |A ∩ B|)
+                intersection = len(query_keywords_set & memory_keywords_set)
+                union = len(query_keywords_set) + len(memory_keywords_set) - intersection
+                keyword_score = intersection / union if union else 0.0
             
             # Combined score (weighted by semantic_weight)
             if query.keywords:
@@ -119,22 +144,25 @@ class SearchService:
             logger.debug(f"Result {memory_id}: vector_score={vector_score}, combined_score={combined_score}")
             
             # Apply time-aware decay (exponential decay based on age)
-            combined_score = self._apply_time_decay(combined_score, memory.created_at)
-            
-            # Promote from cold to hot if accessed
-            self.memory_tiering.promote_to_hot(memory_id)
+            combined_score = self._apply_time_decay(combined_score, memory.created_at, now=now)
             
-            # Get related memories
-            related_memories = self.graph_store.get_related_memories(
-                memory_id,
-                max_depth=1,
-                user_id=user_id,
-            )
-            related_ids = [m.id for m in related_memories[:5]]  # Top 5 related
-            
-            # Update access statistics
-            memory.accessed_at = datetime.utcnow()
-            memory.access_count += 1
+            scored.append((memory, combined_score, vector_score, keyword_score))
+        
+        # Keep the top results by combined score (same order as a stable
+        # descending sort, without sorting every candidate)
+        top = heapq.nlargest(query.limit, scored, key=lambda item: item[1])
+        
+        # Get related memories for the returned hits in one call
+        related_by_id = self.graph_store.get_related_memories_batch(
+            [memory.id for memory, _, _, _ in top],
+            max_depth=1,
+            user_id=user_id,
+        )
+        
+        # Build search results
+        results = []
+        for memory, combined_score, vector_score, keyword_score in top:
+            related_ids = [m.id for m in related_by_id.get(memory.id, [])[:5]]  # Top 5 related
             
             # Create search result
             search_result = SearchResult(
@@ -145,16 +173,20 @@ class SearchService:
             )
             results.append(search_result)
         
-        # Sort by combined score
-        results.sort(key=lambda x: x.score, reverse=True)
-        
-        # Return top results
-        results = results[:query.limit]
+        # Only results actually returned count as accesses
+        for result in results:
+            self.memory_tiering.record_access(result.memory, now)
         
         logger.info(f"Found {len(results)} results for query: {query.query}")
         return results
     
-    def _apply_time_decay(self, score: float, created_at: datetime, half_life_days: Optional[int] = None) -> float:
+    def _apply_time_decay(
+        self,
+        score: float,
+        created_at: datetime,
+        half_life_days: Optional[int] = None,
+        now: Optional[datetime] = None,
+    ) -> float:
         """
         Apply exponential time decay to score based on memory age.
         
@@ -165,12 +197,15 @@ class SearchService:
             score: Original score
             created_at: Memory creation timestamp
             half_life_days: Days for score to decay to 50% (uses config if not provided)
+            now: Reference time (current UTC time if not provided)
             
         Returns:
             Decayed score
         """
         half_life = half_life_days or settings.time_decay_half_life_days
-        age_days = (datetime.utcnow() - created_at).days
+        age_days = ((now or datetime.utcnow()) - created_at).days
+        if half_life == settings.time_decay_half_life_days and 0 <= age_days < len(self._decay_table):
+            return score * self._decay_table[age_days]
         decay_factor = math.exp(-age_days / half_life)
         return score * decay_factor
     
@@ -211,8 +246,7 @@ class SearchService:
         """
         memory = self.graph_store.get_memory(memory_id, user_id=user_id)
         if memory:
-            memory.accessed_at = datetime.utcnow()
-            memory.access_count += 1
+            self.memory_tiering.record_access(memory)
         return memory
     
     async def get_related_memories(self, memory_id: str, user_id: str, max_depth: int = 2) -> List[Memory]:
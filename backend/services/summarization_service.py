@@ -2,7 +2,11 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
 from typing import Optional
 
 from groq import Groq
@@ -11,6 +15,9 @@ from backend.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Only the start of long content is sent to the LLM
+MAX_SUMMARY_INPUT_CHARS = 8000
+
 
 SUMMARIZE_PROMPT = """You are summarizing external web content for a personal knowledge base.
 Given the raw text below, create a concise bullet summary (max 6 bullets) highlighting the key info.
@@ -35,14 +42,30 @@ class SummarizationService:
             raise RuntimeError("GROQ_API_KEY is required for summarization.")
         self.client = Groq(api_key=settings.groq_api_key)
         self.model = settings.summary_model or "llama-3.1-8b-instant"
+        # LRU of summaries keyed by hash of the (truncated) input, so re-ingested
+        # content does not hit the LLM again
+        self._cache: "OrderedDict[bytes, str]" = OrderedDict()
+        self._cache_size = settings.summary_cache_size
 
     async def summarize(self, text: str) -> Optional[str]:
         if not text or len(text) < 120:
             return None
 
-        prompt = SUMMARIZE_PROMPT.format(content=text[:8000])
+        if len(text) > MAX_SUMMARY_INPUT_CHARS:
+            text = text[:MAX_SUMMARY_INPUT_CHARS]
+        cache_key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            self._cache.move_to_end(cache_key)
+            logger.debug("Summary cache hit")
+            return cached
+
+        prompt = SUMMARIZE_PROMPT.format(content=text)
         try:
-            completion = self.client.chat.completions.create(
+            # The Groq client is synchronous; run it in a worker thread so the
+            # event loop keeps serving other requests during the LLM call
+            completion = await asyncio.to_thread(
+                self.client.chat.completions.create,
                 messages=[
                     {"role": "system", "content": "You summarize content for personal notes."},
                     {"role": "user", "content": prompt},
@@ -54,6 +77,7 @@ class SummarizationService:
             summary = completion.choices[0].message.content.strip()
             if not summary:
                 return None
+            self._cache_put(cache_key, summary)
             return summary
         except Exception as exc:
             logger.error("Failed to summarize content: %s", exc)
@@ -62,7 +86,17 @@ class SummarizationService:
             ) from exc
 
 
+    def _cache_put(self, key: bytes, summary: str):
+        if self._cache_size <= 0:
+            return
+        self._cache[key] = summary
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+
 _summarizer: Optional[SummarizationService] = None
+_summarizer_lock = threading.Lock()
 
 
 def get_summarization_service() -> Optional[SummarizationService]:
@@ -71,6 +105,8 @@ def get_summarization_service() -> Optional[SummarizationService]:
         if not settings.groq_api_key:
             logger.warning("GROQ_API_KEY missing; summarization disabled.")
             return None
-        _summarizer = SummarizationService()
+        with _summarizer_lock:
+            if _summarizer is None:
+                _summarizer = SummarizationService()
     return _summarizer
 
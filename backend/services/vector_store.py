@@ -1,6 +1,6 @@
 """Vector store using Qdrant for semantic search"""
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from qdrant_client import QdrantClient
 from qdrant_client.models import (
     Distance,
@@ -10,14 +10,123 @@ from qdrant_client.models import (
     FieldCondition,
     MatchValue,
     FilterSelector,
+    SearchRequest,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    QuantizationSearchParams,
+    HnswConfigDiff,
+    OptimizersConfigDiff,
+    PayloadSelectorInclude,
 )
 from backend.config import settings
 from backend.models import Memory, MemoryRelationship
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import calendar
+import json
 import logging
+import threading
+import httpx
 
 logger = logging.getLogger(__name__)
 
 
+# Payload index types for fields that are not plain keywords
+_PAYLOAD_INDEX_SCHEMAS = {"created_at": "integer"}
+
+
+def _compact(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop None and empty list/dict values (readers fall back to defaults)."""
+    return {
+        key: value for key, value in payload.items()
+        if value is not None and value != [] and value != {}
+    }
+
+
+def to_epoch(value: datetime) -> int:
+    """Convert a naive UTC datetime to integer epoch seconds."""
+    return calendar.timegm(value.utctimetuple())
+
+
+def parse_payload_datetime(value: Any) -> Optional[datetime]:
+    """Parse a stored timestamp (epoch seconds or legacy ISO string) as naive UTC."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.utcfromtimestamp(value)
+    return datetime.fromisoformat(value)
+
+
+def _memory_to_point(memory: Memory) -> PointStruct:
+    """Build the Qdrant point (vector + payload) stored for a memory."""
+    return PointStruct(
+        id=memory.id,
+        vector=memory.embedding,
+        payload=_compact({
+            "content": memory.content,
+            "summary": memory.summary,
+            "document_id": memory.document_id,
+            "chunk_index": memory.chunk_index,
+            "is_latest": memory.is_latest,
+            "is_active": memory.is_active,
+            "keywords": memory.keywords,
+            "entities": memory.entities,
+            "entities_by_type": memory.entities_by_type,
+            "created_at": to_epoch(memory.created_at),
+            "metadata": memory.metadata,
+            "user_id": memory.user_id,
+        })
+    )
+
+
+@lru_cache(maxsize=1024)
+def _build_filter_cached(user_id: Optional[str], items: Tuple[Tuple[str, Any], ...]) -> Optional[Filter]:
+    """Build (and memoize) a filter; the client only serializes it, so reuse is safe."""
+    must_conditions = []
+
+    if user_id:
+        must_conditions.append(
+            FieldCondition(
+                key="user_id",
+                match=MatchValue(value=user_id)
+            )
+        )
+
+    for key, value in items:
+        must_conditions.append(
+            FieldCondition(
+                key=key,
+                match=MatchValue(value=value)
+            )
+        )
+
+    if must_conditions:
+        return Filter(must=must_conditions)
+    return None
+
+
+def _relationship_to_point(relationship: MemoryRelationship) -> PointStruct:
+    """Build the Qdrant point stored for a relationship (placeholder 1-d vector)."""
+    return PointStruct(
+        id=relationship.id,
+        vector=[relationship.confidence or 0.0],
+        payload={
+            "from_memory_id": relationship.from_memory_id,
+            "to_memory_id": relationship.to_memory_id,
+            "relationship_type": relationship.relationship_type.value,
+            "confidence": relationship.confidence,
+            "similarity_score": relationship.similarity_score,
+            "reason": relationship.reason,
+            "created_at": relationship.created_at.isoformat(),
+            "user_id": relationship.user_id,
+            "metadata": relationship.metadata,
+        },
+    )
+
+
 class VectorStore:
     """Manages vector storage and retrieval using Qdrant"""
     
@@ -56,9 +165,19 @@ class VectorStore:
                     client_kwargs["port"] = settings.qdrant_port
                     client_kwargs["https"] = settings.qdrant_use_https
 
+                if settings.qdrant_prefer_grpc:
+                    client_kwargs["prefer_grpc"] = True
+                    client_kwargs["grpc_port"] = settings.qdrant_grpc_port
+
                 if settings.qdrant_api_key:
                     client_kwargs["api_key"] = settings.qdrant_api_key
 
+                # Keep warm connections for REST calls (forwarded to httpx)
+                client_kwargs["limits"] = httpx.Limits(
+                    max_connections=settings.qdrant_pool_size,
+                    max_keepalive_connections=settings.qdrant_pool_size,
+                )
+
                 self.client = QdrantClient(**client_kwargs)
                 # Test connection
                 self.client.get_collections()
@@ -86,20 +205,50 @@ class VectorStore:
     def _ensure_payload_indexes(self, collection_name: str, fields: Optional[List[str]] = None):
         """Ensure payload indexes exist for filtered fields."""
         fields = fields or ["user_id"]
+        # Only create indexes missing from the collection's payload schema
         try:
-            for field in fields:
+            existing = set(self.client.get_collection(collection_name).payload_schema or {})
+        except Exception as exc:
+            logger.warning(f"Failed to read payload schema for {collection_name}: {exc}")
+            existing = set()
+
+        for field in fields:
+            if field in existing:
+                logger.debug(f"Payload index on {field} already exists ({collection_name})")
+                continue
+            try:
                 self.client.create_payload_index(
                     collection_name=collection_name,
                     field_name=field,
-                    field_schema="keyword",
+                    field_schema=_PAYLOAD_INDEX_SCHEMAS.get(field, "keyword"),
                 )
                 logger.info(f"Created payload index on {field} ({collection_name})")
-        except Exception as exc:  # Qdrant returns error if index already exists
-            message = str(exc).lower()
-            if "already exists" in message:
-                logger.debug(f"Payload index on {field} already exists ({collection_name})")
-            else:
-                logger.warning(f"Failed to create payload index on {field}: {exc}")
+            except Exception as exc:  # Qdrant returns error if index already exists
+                message = str(exc).lower()
+                if "already exists" in message:
+                    logger.debug(f"Payload index on {field} already exists ({collection_name})")
+                else:
+                    logger.warning(f"Failed to create payload index on {field}: {exc}")
+
+    def _quantization_config(self) -> Optional[ScalarQuantization]:
+        """int8 scalar quantization for memory vectors (originals are kept on disk for rescoring)."""
+        if not settings.qdrant_int8_quantization:
+            return None
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True,
+            )
+        )
+
+    def _search_params(self) -> SearchParams:
+        """Search parameters: HNSW beam width, and with quantization enabled scan
+        quantized vectors then rescore the oversampled top hits."""
+        quantization = None
+        if settings.qdrant_int8_quantization:
+            quantization = QuantizationSearchParams(ignore=False, rescore=True, oversampling=2.0)
+        return SearchParams(hnsw_ef=settings.qdrant_hnsw_ef, exact=False, quantization=quantization)
 
     def _initialize_collections(self):
         """Initialize required Qdrant collections"""
@@ -114,20 +263,31 @@ class VectorStore:
                     collection_name=self.collection_name,
                     vectors_config=VectorParams(
                         size=settings.embedding_dimension,
-                        distance=Distance.COSINE
-                    )
+                        distance=Distance.COSINE,
+                        # Full-precision vectors are only read for rescoring
+                        on_disk=settings.qdrant_int8_quantization,
+                    ),
+                    # payload_m builds extra links within each indexed payload
+                    # value, keeping user-scoped searches on the HNSW graph
+                    hnsw_config=HnswConfigDiff(m=16, ef_construct=128, payload_m=16, on_disk=False),
+                    optimizers_config=OptimizersConfigDiff(memmap_threshold=20000, indexing_threshold=20000),
+                    quantization_config=self._quantization_config(),
                 )
                 logger.info(f"Collection created: {self.collection_name}")
-                self._ensure_payload_indexes(self.collection_name)
+                self._ensure_payload_indexes(self.collection_name, ["user_id", "created_at"])
             else:
                 logger.info(f"Collection already exists: {self.collection_name}")
-                self._ensure_payload_indexes(self.collection_name)
+                self._ensure_payload_indexes(self.collection_name, ["user_id", "created_at"])
 
             if self.relationship_collection not in collection_names:
                 logger.info(f"Creating relationship collection: {self.relationship_collection}")
                 self.client.create_collection(
                     collection_name=self.relationship_collection,
                     vectors_config=VectorParams(size=1, distance=Distance.COSINE),
+                    # Relationships are only read by payload filters and scrolls;
+                    # the placeholder vector needs no HNSW graph
+                    hnsw_config=HnswConfigDiff(m=0),
+                    optimizers_config=OptimizersConfigDiff(indexing_threshold=0),
                 )
                 logger.info(f"Relationship collection created: {self.relationship_collection}")
                 self._ensure_payload_indexes(self.relationship_collection, ["user_id", "from_memory_id", "to_memory_id"])
@@ -148,27 +308,9 @@ class VectorStore:
         if not memory.embedding:
             raise ValueError("Memory must have an embedding")
         
-        point = PointStruct(
-            id=memory.id,
-            vector=memory.embedding,
-            payload={
-                "content": memory.content,
-                "summary": memory.summary,
-                "document_id": memory.document_id,
-                "chunk_index": memory.chunk_index,
-                "is_latest": memory.is_latest,
-                "is_active": memory.is_active,
-                "keywords": memory.keywords,
-                "entities": memory.entities,
-                "created_at": memory.created_at.isoformat(),
-                "metadata": memory.metadata,
-                "user_id": memory.user_id,
-            }
-        )
-        
         self.client.upsert(
             collection_name=self.collection_name,
-            points=[point]
+            points=[_memory_to_point(memory)]
         )
         logger.debug(f"Added memory to vector store: {memory.id}")
     
@@ -185,95 +327,76 @@ class VectorStore:
                 logger.warning(f"Skipping memory without embedding: {memory.id}")
                 continue
             
-            point = PointStruct(
-                id=memory.id,
-                vector=memory.embedding,
-                payload={
-                    "content": memory.content,
-                    "summary": memory.summary,
-                    "document_id": memory.document_id,
-                    "chunk_index": memory.chunk_index,
-                    "is_latest": memory.is_latest,
-                    "is_active": memory.is_active,
-                    "keywords": memory.keywords,
-                    "entities": memory.entities,
-                    "created_at": memory.created_at.isoformat(),
-                    "metadata": memory.metadata,
-                    "user_id": memory.user_id,
-                }
-            )
-            points.append(point)
+            points.append(_memory_to_point(memory))
         
-        if points:
+        # Upsert in fixed-size requests so large ingests stay within Qdrant's
+        # efficient request size
+        batch_size = max(1, settings.qdrant_upsert_batch_size)
+        for start in range(0, len(points), batch_size):
             self.client.upsert(
                 collection_name=self.collection_name,
-                points=points
+                points=points[start:start + batch_size]
             )
+        if points:
             logger.info(f"Added {len(points)} memories to vector store")
 
     def add_relationship(self, relationship: MemoryRelationship):
         """
         Persist a relationship in the relationship collection.
         """
-        payload = {
-            "from_memory_id": relationship.from_memory_id,
-            "to_memory_id": relationship.to_memory_id,
-            "relationship_type": relationship.relationship_type.value,
-            "confidence": relationship.confidence,
-            "similarity_score": relationship.similarity_score,
-            "reason": relationship.reason,
-            "created_at": relationship.created_at.isoformat(),
-            "user_id": relationship.user_id,
-            "metadata": relationship.metadata,
-        }
-
-        point = PointStruct(
-            id=relationship.id,
-            vector=[relationship.confidence or 0.0],
-            payload=payload,
-        )
-
         self.client.upsert(
             collection_name=self.relationship_collection,
-            points=[point],
+            points=[_relationship_to_point(relationship)],
         )
         logger.debug(f"Persisted relationship {relationship.id} in vector store")
 
-    def _build_filter(self, user_id: Optional[str], filters: Optional[Dict[str, Any]]) -> Optional[Filter]:
-        """Create a Qdrant filter for the provided payload filters and user scope"""
-        must_conditions = []
-
-        if user_id:
-            must_conditions.append(
-                FieldCondition(
-                    key="user_id",
-                    match=MatchValue(value=user_id)
-                )
+    def add_relationships_batch(self, relationships: List[MemoryRelationship]):
+        """
+        Persist multiple relationships in the relationship collection.
+        
+        Args:
+            relationships: List of MemoryRelationship objects
+        """
+        points = [_relationship_to_point(relationship) for relationship in relationships]
+        batch_size = max(1, settings.qdrant_upsert_batch_size)
+        for start in range(0, len(points), batch_size):
+            self.client.upsert(
+                collection_name=self.relationship_collection,
+                points=points[start:start + batch_size],
             )
+        if points:
+            logger.debug(f"Persisted {len(points)} relationships in vector store")
 
-        if filters:
-            for key, value in filters.items():
-                must_conditions.append(
-                    FieldCondition(
-                        key=key,
-                        match=MatchValue(value=value)
-                    )
-                )
-
-        if must_conditions:
-            return Filter(must=must_conditions)
-        return None
+    def _build_filter(self, user_id: Optional[str], filters: Optional[Dict[str, Any]]) -> Optional[Filter]:
+        """Create a Qdrant filter for the provided payload filters and user scope"""
+        items = tuple(sorted(filters.items())) if filters else ()
+        try:
+            return _build_filter_cached(user_id, items)
+        except TypeError:  # unhashable filter value
+            return _build_filter_cached.__wrapped__(user_id, items)
 
     def _scroll_collection(
         self,
         collection_name: str,
         user_id: Optional[str] = None,
-        limit: int = 256,
+        limit: int = 1024,
+        payload_fields: Optional[List[str]] = None,
     ):
-        """Scroll through entire collection, returning all records (payload only)."""
+        """
+        Scroll through entire collection, returning all records (payload only).
+        
+        Args:
+            payload_fields: Payload keys to return (None = full payload, [] = IDs only)
+        """
         records = []
         offset = None
         payload_filter = self._build_filter(user_id, None)
+        if payload_fields is None:
+            with_payload = True
+        elif payload_fields:
+            with_payload = PayloadSelectorInclude(include=payload_fields)
+        else:
+            with_payload = False
 
         while True:
             batch, offset = self.client.scroll(
@@ -281,7 +404,7 @@ class VectorStore:
                 scroll_filter=payload_filter,
                 limit=limit,
                 offset=offset,
-                with_payload=True,
+                with_payload=with_payload,
                 with_vectors=False,
             )
             records.extend(batch)
@@ -295,7 +418,7 @@ class VectorStore:
 
     def fetch_all_relationships(self, user_id: Optional[str] = None):
         """Retrieve all relationships stored in Qdrant (payloads)."""
-        return self._scroll_collection(self.relationship_collection, user_id=user_id, limit=512)
+        return self._scroll_collection(self.relationship_collection, user_id=user_id)
     
     def search(
         self,
@@ -330,6 +453,8 @@ class VectorStore:
         if payload_filter:
             search_params["query_filter"] = payload_filter
         
+        search_params["search_params"] = self._search_params()
+        
         results = self.client.search(**search_params)
         
         return [
@@ -341,6 +466,60 @@ class VectorStore:
             for result in results
         ]
     
+    def search_batch(
+        self,
+        query_vectors: List[List[float]],
+        limit: int = 10,
+        score_threshold: Optional[float] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        user_id: Optional[str] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for similar memories for several query vectors in one request.
+        
+        Args:
+            query_vectors: Query embedding vectors
+            limit: Maximum number of results per query
+            score_threshold: Minimum similarity score
+            filters: Additional filters applied to every query
+            
+        Returns:
+            One list of search results per query vector, in input order
+        """
+        if not query_vectors:
+            return []
+        
+        payload_filter = self._build_filter(user_id, filters)
+        params = self._search_params()
+        requests = [
+            SearchRequest(
+                vector=query_vector,
+                limit=limit,
+                filter=payload_filter,
+                params=params,
+                score_threshold=score_threshold or None,
+                with_payload=True,
+            )
+            for query_vector in query_vectors
+        ]
+        
+        batch_results = self.client.search_batch(
+            collection_name=self.collection_name,
+            requests=requests,
+        )
+        
+        return [
+            [
+                {
+                    "id": result.id,
+                    "score": result.score,
+                    "payload": result.payload
+                }
+                for result in results
+            ]
+            for results in batch_results
+        ]
+    
     def get_memory(self, memory_id: str) -> Optional[Dict[str, Any]]:
         """
         Retrieve a specific memory by ID.
@@ -395,6 +574,28 @@ class VectorStore:
         )
         logger.debug(f"Updated memory payload: {memory_id}")
 
+    def update_memories_payload_bulk(self, updates: Dict[str, Dict[str, Any]]):
+        """
+        Update the payloads of several memories, one request per distinct payload.
+        
+        Args:
+            updates: New payload data keyed by memory ID
+        """
+        groups: Dict[str, List[str]] = {}
+        payloads: Dict[str, Dict[str, Any]] = {}
+        for memory_id, payload in updates.items():
+            key = json.dumps(payload, sort_keys=True, default=str)
+            groups.setdefault(key, []).append(memory_id)
+            payloads[key] = payload
+        
+        for key, memory_ids in groups.items():
+            self.client.set_payload(
+                collection_name=self.collection_name,
+                payload=payloads[key],
+                points=memory_ids
+            )
+        logger.debug(f"Updated payloads of {len(updates)} memories in {len(groups)} requests")
+
     def delete_memories_by_user(self, user_id: str):
         """
         Delete all memories associated with a specific user.
@@ -404,21 +605,23 @@ class VectorStore:
         """
         if not user_id:
             return
-        selector = FilterSelector(
-            filter=Filter(
-                must=[
-                    FieldCondition(
-                        key="user_id",
-                        match=MatchValue(value=user_id)
-                    )
-                ]
-            )
-        )
-        self.client.delete(
-            collection_name=self.collection_name,
-            points_selector=selector
-        )
-        self.delete_relationships_by_user(user_id)
+        selector = FilterSelector(filter=self._build_filter(user_id, None))
+        # Both collections are independent, so delete from them concurrently
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [
+                executor.submit(
+                    self.client.delete,
+                    collection_name=self.collection_name,
+                    points_selector=selector,
+                ),
+                executor.submit(
+                    self.client.delete,
+                    collection_name=self.relationship_collection,
+                    points_selector=selector,
+                ),
+            ]
+            for future in futures:
+                future.result()
         logger.info(f"Deleted Qdrant memories and relationships for user {user_id}")
 
     def delete_relationships_by_user(self, user_id: str):
@@ -444,12 +647,15 @@ class VectorStore:
 
 # Global instance
 _vector_store = None
+_vector_store_lock = threading.Lock()
 
 
 def get_vector_store() -> VectorStore:
     """Get singleton vector store instance"""
     global _vector_store
     if _vector_store is None:
-        _vector_store = VectorStore()
+        with _vector_store_lock:
+            if _vector_store is None:
+                _vector_store = VectorStore()
     return _vector_store
 
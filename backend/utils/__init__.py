@@ -1,6 +1,6 @@
 """Utility functions for Second Brain"""
 
-from .visualizer import visualize_graph
+from .visualizer import iter_html, visualize_graph
 
-__all__ = ["visualize_graph"]
+__all__ = ["iter_html", "visualize_graph"]
 
@@ -1,129 +1,123 @@
 """Graph visualization utilities"""
 
 import json
-from typing import Optional
+from collections import Counter
+from string import Template
+from typing import Iterator, Optional
 
 
-def visualize_graph(graph_data: dict, output_file: str = "graph_visualization.html"):
-    """
-    Create an interactive HTML visualization of the knowledge graph.
-    
-    Args:
-        graph_data: Graph data from graph_store.export_graph()
-        output_file: Output HTML file path
-    """
-    
-    # HTML template with vis.js for graph visualization
-    html_template = """
+# HTML template with vis.js for graph visualization (${name} placeholders,
+# so CSS/JS braces need no escaping)
+_HTML_TEMPLATE_STR = """
 <!DOCTYPE html>
 <html>
 <head>
     <title>Second Brain - Knowledge Graph</title>
     <script type="text/javascript" src="https://unpkg.com/vis-network/standalone/umd/vis-network.min.js"></script>
     <style type="text/css">
-        body {{
+        body {
             font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
             margin: 0;
             padding: 0;
             background: #f5f5f5;
-        }}
+        }
         
-        #header {{
+        #header {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
             padding: 20px;
             box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
+        }
         
-        #header h1 {{
+        #header h1 {
             margin: 0;
             font-size: 28px;
-        }}
+        }
         
-        #header p {{
+        #header p {
             margin: 5px 0 0 0;
             opacity: 0.9;
-        }}
+        }
         
-        #stats {{
+        #stats {
             background: white;
             margin: 20px;
             padding: 20px;
             border-radius: 8px;
             box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
+        }
         
-        #stats h2 {{
+        #stats h2 {
             margin-top: 0;
             color: #333;
-        }}
+        }
         
-        .stat-grid {{
+        .stat-grid {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
             gap: 15px;
             margin-top: 15px;
-        }}
+        }
         
-        .stat-card {{
+        .stat-card {
             background: #f8f9fa;
             padding: 15px;
             border-radius: 6px;
             border-left: 4px solid #667eea;
-        }}
+        }
         
-        .stat-card .label {{
+        .stat-card .label {
             font-size: 12px;
             color: #666;
             text-transform: uppercase;
             letter-spacing: 0.5px;
-        }}
+        }
         
-        .stat-card .value {{
+        .stat-card .value {
             font-size: 24px;
             font-weight: bold;
             color: #333;
             margin-top: 5px;
-        }}
+        }
         
-        #mynetwork {{
+        #mynetwork {
             width: calc(100% - 40px);
             height: 600px;
             margin: 20px;
             background: white;
             border-radius: 8px;
             box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
+        }
         
-        #legend {{
+        #legend {
             background: white;
             margin: 0 20px 20px 20px;
             padding: 20px;
             border-radius: 8px;
             box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
+        }
         
-        #legend h3 {{
+        #legend h3 {
             margin-top: 0;
             color: #333;
-        }}
+        }
         
-        .legend-item {{
+        .legend-item {
             display: inline-block;
             margin-right: 20px;
             margin-bottom: 10px;
-        }}
+        }
         
-        .legend-color {{
+        .legend-color {
             display: inline-block;
             width: 20px;
             height: 20px;
             border-radius: 3px;
             vertical-align: middle;
             margin-right: 5px;
-        }}
+        }
         
-        #info {{
+        #info {
             position: fixed;
             bottom: 20px;
             right: 20px;
@@ -133,22 +127,22 @@ def visualize_graph(graph_data: dict, output_file: str = "graph_visualization.ht
             box-shadow: 0 2px 10px rgba(0,0,0,0.2);
             max-width: 300px;
             display: none;
-        }}
+        }
         
-        #info.show {{
+        #info.show {
             display: block;
-        }}
+        }
         
-        #info h4 {{
+        #info h4 {
             margin: 0 0 10px 0;
             color: #667eea;
-        }}
+        }
         
-        #info p {{
+        #info p {
             margin: 5px 0;
             font-size: 14px;
             color: #666;
-        }}
+        }
     </style>
 </head>
 <body>
@@ -162,27 +156,27 @@ def visualize_graph(graph_data: dict, output_file: str = "graph_visualization.ht
         <div class="stat-grid">
             <div class="stat-card">
                 <div class="label">Total Memories</div>
-                <div class="value">{total_memories}</div>
+                <div class="value">${total_memories}</div>
             </div>
             <div class="stat-card">
                 <div class="label">Total Relationships</div>
-                <div class="value">{total_relationships}</div>
+                <div class="value">${total_relationships}</div>
             </div>
             <div class="stat-card">
                 <div class="label">Updates</div>
-                <div class="value">{updates_count}</div>
+                <div class="value">${updates_count}</div>
             </div>
             <div class="stat-card">
                 <div class="label">Extends</div>
-                <div class="value">{extends_count}</div>
+                <div class="value">${extends_count}</div>
             </div>
             <div class="stat-card">
                 <div class="label">Similar</div>
-                <div class="value">{similar_count}</div>
+                <div class="value">${similar_count}</div>
             </div>
             <div class="stat-card">
                 <div class="label">Derives</div>
-                <div class="value">{derives_count}</div>
+                <div class="value">${derives_count}</div>
             </div>
         </div>
     </div>
@@ -224,105 +218,108 @@ def visualize_graph(graph_data: dict, output_file: str = "graph_visualization.ht
 
     <script type="text/javascript">
         // Graph data
-        var graphData = {graph_json};
+        var graphData = ${graph_json};
         
         // Create nodes for vis.js
-        var nodes = graphData.nodes.map(function(node) {{
+        var nodes = graphData.nodes.map(function(node) {
             var color = node.is_latest ? '#4CAF50' : '#9E9E9E';
-            return {{
+            return {
                 id: node.id,
                 label: node.label.substring(0, 30) + '...',
                 title: node.full_content,
-                color: {{
+                color: {
                     background: color,
                     border: node.is_latest ? '#388E3C' : '#757575',
-                    highlight: {{
+                    highlight: {
                         background: '#667eea',
                         border: '#5568d3'
-                    }}
-                }},
-                font: {{
+                    }
+                },
+                font: {
                     color: 'white',
                     size: 14
-                }},
+                },
                 shape: 'box',
                 margin: 10,
                 data: node
-            }};
-        }});
+            };
+        });
+        
+        // Edge styling shared by every edge (built once, not per edge)
+        var EDGE_COLOR_MAP = {
+            'updates': '#FF9800',
+            'extends': '#2196F3',
+            'similar': '#9C27B0',
+            'derives': '#E91E63'
+        };
+        var EDGE_FONT = {
+            size: 10,
+            align: 'middle',
+            color: '#666'
+        };
+        var EDGE_SMOOTH = {
+            type: 'curvedCW',
+            roundness: 0.2
+        };
         
         // Create edges for vis.js
-        var edges = graphData.edges.map(function(edge) {{
-            var colorMap = {{
-                'updates': '#FF9800',
-                'extends': '#2196F3',
-                'similar': '#9C27B0',
-                'derives': '#E91E63'
-            }};
-            
-            var color = colorMap[edge.type] || '#999';
+        var edges = graphData.edges.map(function(edge) {
+            var color = EDGE_COLOR_MAP[edge.type] || '#999';
             
-            return {{
+            return {
                 from: edge.source,
                 to: edge.target,
                 arrows: 'to',
-                color: {{
+                color: {
                     color: color,
                     highlight: '#667eea'
-                }},
+                },
                 label: edge.type.toUpperCase(),
-                font: {{
-                    size: 10,
-                    align: 'middle',
-                    color: '#666'
-                }},
+                font: EDGE_FONT,
                 width: 2,
-                smooth: {{
-                    type: 'curvedCW',
-                    roundness: 0.2
-                }},
+                smooth: EDGE_SMOOTH,
                 data: edge
-            }};
-        }});
+            };
+        });
         
         // Create a network
         var container = document.getElementById('mynetwork');
-        var data = {{
+        var data = {
             nodes: new vis.DataSet(nodes),
             edges: new vis.DataSet(edges)
-        }};
+        };
         
-        var options = {{
-            physics: {{
+        var options = {
+            physics: {
                 enabled: true,
-                barnesHut: {{
+                barnesHut: {
                     gravitationalConstant: -2000,
                     springConstant: 0.001,
                     springLength: 200
-                }},
-                stabilization: {{
+                },
+                stabilization: {
                     iterations: 150
-                }}
-            }},
-            interaction: {{
+                }
+            },
+            interaction: {
                 hover: true,
                 tooltipDelay: 100
-            }},
-            layout: {{
+            },
+            layout: {
                 improvedLayout: true,
                 hierarchical: false
-            }}
-        }};
+            }
+        };
         
         var network = new vis.Network(container, data, options);
         
         // Click event
-        network.on("click", function(params) {{
-            if (params.nodes.length > 0) {{
+        network.on("click", function(params) {
+            if (params.nodes.length > 0) {
                 var nodeId = params.nodes[0];
                 var node = nodes.find(n => n.id === nodeId);
                 
-                if (node) {{
+                if (node) {
                     var infoDiv = document.getElementById('info');
                     var infoContent = document.getElementById('info-content');
                     
@@ -332,36 +329,71 @@ def visualize_graph(graph_data: dict, output_file: str = "graph_visualization.ht
                         '<p><strong>Latest:</strong> ' + (node.data.is_latest ? 'Yes' : 'No') + '</p>';
                     
                     infoDiv.classList.add('show');
-                }}
-            }} else {{
+                }
+            } else {
                 document.getElementById('info').classList.remove('show');
-            }}
-        }});
+            }
+        });
         
         console.log('Graph loaded with', nodes.length, 'nodes and', edges.length, 'edges');
     </script>
 </body>
 </html>
 """
+
+# Split around the graph JSON so pages can be streamed: the head (with the
+# stats placeholders) is sent before the graph JSON is serialized
+_HTML_HEAD_STR, _HTML_TAIL_STR = _HTML_TEMPLATE_STR.split("${graph_json}")
+_HTML_HEAD = Template(_HTML_HEAD_STR)
+_HTML_TAIL = _HTML_TAIL_STR.encode('utf-8')
+
+
+def iter_html(graph_data: dict) -> Iterator[bytes]:
+    """
+    Render the visualization page as a sequence of UTF-8 chunks.
     
-    # Get stats
-    stats = graph_data.get('stats', {})
-    relationship_types = stats.get('relationship_types', {})
+    Args:
+        graph_data: Graph data from graph_store.export_graph()
+        
+    Yields:
+        Page head (with stats), graph JSON, then the page tail
+    """
+    # Get stats (exports without them are counted in a single pass over edges)
+    stats = graph_data.get('stats') or {}
+    nodes = graph_data.get('nodes', [])
+    edges = graph_data.get('edges', [])
+    relationship_types = stats.get('relationship_types') or Counter(edge.get('type') for edge in edges)
     
-    # Fill in template
-    html_content = html_template.format(
-        graph_json=json.dumps(graph_data),
-        total_memories=stats.get('total_memories', 0),
-        total_relationships=stats.get('total_relationships', 0),
+    yield _HTML_HEAD.safe_substitute(
+        total_memories=stats.get('total_memories', len(nodes)),
+        total_relationships=stats.get('total_relationships', len(edges)),
         updates_count=relationship_types.get('updates', 0),
         extends_count=relationship_types.get('extends', 0),
         similar_count=relationship_types.get('similar', 0),
         derives_count=relationship_types.get('derives', 0)
+    ).encode('utf-8')
+    # Escape HTML-significant characters so memory text can't close the <script> block
+    graph_json = (
+        json.dumps(graph_data)
+        .replace('<', '\\u003c')
+        .replace('>', '\\u003e')
+        .replace('&', '\\u0026')
     )
+    yield graph_json.encode('utf-8')
+    yield _HTML_TAIL
+
+
+def visualize_graph(graph_data: dict, output_file: str = "graph_visualization.html"):
+    """
+    Create an interactive HTML visualization of the knowledge graph.
     
-    # Write to file
-    with open(output_file, 'w') as f:
-        f.write(html_content)
+    Args:
+        graph_data: Graph data from graph_store.export_graph()
+        output_file: Output HTML file path
+    """
+    # Write to file as UTF-8 bytes (no text-mode codec or newline translation)
+    with open(output_file, 'wb') as f:
+        f.writelines(iter_html(graph_data))
     
     print(f"✅ Graph visualization saved to: {output_file}")
     print(f"   Open it in your browser to explore the knowledge graph!")
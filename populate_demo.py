@@ -82,31 +82,62 @@ DEMO_DATA = [
     }
 ]
 
-async def ingest_note(client, note):
-    print(f"Ingesting {note['title']}...")
-    payload = {
-        "type": "note",
-        "title": note["title"],
-        "content": note["content"]
-    }
-    headers = {"Authorization": "Bearer test-token"}
-    try:
-        response = await client.post(f"{BASE_URL}/documents/ingest", json=payload, headers=headers, timeout=30.0)
-        if response.status_code != 200:
-            print(f"Failed to ingest {note['title']}: {response.text}")
+HEADERS = {"Authorization": "Bearer test-token"}
+BATCH_SIZE = 32
+
+class BufferedIngester:
+    """Buffers demo entries and sends them to /documents/ingest_batch in batches."""
+
+    def __init__(self, client, threshold=BATCH_SIZE):
+        self.client = client
+        self.threshold = threshold
+        self.buffer = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.flush()
+
+    async def add(self, note):
+        self.buffer.append(note)
+        if len(self.buffer) >= self.threshold:
+            await self.flush()
+
+    async def flush(self):
+        if not self.buffer:
             return
-        data = response.json()
-        print(f"Successfully ingested {note['title']}")
-    except Exception as e:
-        print(f"Error ingesting {note['title']}: {e}")
+        batch, self.buffer = self.buffer, []
+        titles = ", ".join(note["title"] for note in batch)
+        print(f"Ingesting {len(batch)} entries: {titles}...")
+        payload = [
+            {key: note[key] for key in ("type", "title", "content", "url") if key in note}
+            for note in batch
+        ]
+        try:
+            response = await self.client.post(
+                f"{BASE_URL}/documents/ingest_batch", json=payload, headers=HEADERS, timeout=120.0
+            )
+            if response.status_code != 200:
+                print(f"Failed to ingest batch: {response.text}")
+                return
+            results = response.json()
+            failed = [result for result in results if result.get("error")]
+            for result in failed:
+                print(f"Failed to ingest {batch[result['index']]['title']}: {result['error']}")
+            print(f"Successfully ingested {len(results) - len(failed)} entries")
+        except Exception as e:
+            print(f"Error ingesting batch: {e}")
 
 async def main():
     print("Populating database with demo data...")
     async with httpx.AsyncClient() as client:
-        for item in DEMO_DATA:
-            await ingest_note(client, item)
-            # Small delay to ensure order/processing
-            await asyncio.sleep(0.5)
+        # Items are buffered and sent in DEMO_DATA order; the batch endpoint
+        # indexes and links each batch in list order, so later items relate
+        # back to earlier ones.
+        async with BufferedIngester(client) as ingester:
+            for item in DEMO_DATA:
+                await ingester.add(item)
     
     print("\nDone! You can now check the graph visualization.")
 